@@ -4,22 +4,35 @@ Supports both simple metadata and enhanced PDF chunk modes
 Location: backend/app.py
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Dict, Optional
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import AsyncIterator, List, Dict, Literal, Optional, Tuple, Union
 from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
 import sys
 import os
 import json
+import secrets
+import time
+
+import numpy as np
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from models.rag_bot import RAGAccountantBot
+from models.rag_bot import RAGAccountantBot, DEFAULT_MODEL_NAME, load_embedder
+from models.query_cache import TTLCache
+from models.batcher import MicroBatcher
+from models.shared_index import build_or_attach
+from utils.pdf_fill_engine import format_value
+from utils.template_registry import TemplateRegistry
 from data.loader import (
     load_irs_forms,
     convert_to_bot_format,
-    convert_enhanced_to_bot_format
+    iter_enhanced_documents
 )
 
 # Configuration
@@ -29,65 +42,292 @@ USE_ENHANCED_MODE = os.environ.get("USE_ENHANCED_MODE", "false").lower() == "tru
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # Construct absolute paths relative to app.py location
-ENHANCED_DATA_PATH = os.path.join(BASE_DIR, "assets", "irs_forms_enhanced.json")
+ENHANCED_DATA_PATH = os.path.join(BASE_DIR, "assets", "irs_forms_enhanced.jsonl")
+# Indented single-array JSON written by older versions of data.loader
+LEGACY_ENHANCED_DATA_PATH = os.path.join(BASE_DIR, "assets", "irs_forms_enhanced.json")
 SIMPLE_DATA_PATH = os.path.join(BASE_DIR, "assets", "irs_forms_metadata.json")
 
+# Persistent embedding cache (set EMBEDDING_CACHE_DIR="" to disable)
+EMBEDDING_CACHE_DIR = os.environ.get(
+    "EMBEDDING_CACHE_DIR", os.path.join(BASE_DIR, "assets", "cache")
+) or None
+
+# Embedding matrix storage: float32 (in memory), float16 or int8 (memory-mapped)
+EMBEDDING_STORAGE = os.environ.get("EMBEDDING_STORAGE", "float32").lower()
+EMBEDDING_STORAGE_DIR = EMBEDDING_CACHE_DIR or os.path.join(BASE_DIR, "assets", "cache")
+
+# Approximate nearest-neighbour index for large corpora (ANN_INDEX=ivf to enable)
+ANN_INDEX = os.environ.get("ANN_INDEX", "").lower() or None
+ANN_MIN_DOCS = int(os.environ.get("ANN_MIN_DOCS", "20000"))
+ANN_N_LISTS = int(os.environ["ANN_N_LISTS"]) if os.environ.get("ANN_N_LISTS") else None
+ANN_N_PROBE = int(os.environ.get("ANN_N_PROBE", "8"))
+
+# LRU cache of query embeddings (0 disables)
+QUERY_CACHE_SIZE = int(os.environ.get("QUERY_CACHE_SIZE", "1024"))
+
+# Hybrid lexical scoring: weight of BM25 added to dense similarity (0 disables)
+HYBRID_WEIGHT = float(os.environ.get("HYBRID_WEIGHT", "0.3"))
+
+# Cache of finished /api/query responses (size 0 disables)
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "2048"))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "300"))
+
+# Model inference and scoring run in a thread pool so the event loop stays free.
+# Encoding releases the GIL inside torch/numpy; the model itself cannot be
+# shared across processes, so threads are the pool type used here.
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "2"))
+MAX_CONCURRENT_QUERIES = int(os.environ.get("MAX_CONCURRENT_QUERIES", "32"))
+
+# Concurrent /api/query requests are coalesced into one encode call when they
+# arrive within MICRO_BATCH_WAIT_MS of each other (0 disables coalescing)
+MICRO_BATCH_WAIT_MS = float(os.environ.get("MICRO_BATCH_WAIT_MS", "5"))
+MICRO_BATCH_MAX_SIZE = int(os.environ.get("MICRO_BATCH_MAX_SIZE", "32"))
+
+# Share one index between uvicorn workers: the first worker builds it into
+# this directory and all workers memory-map it read-only (unset = per process)
+SHARED_INDEX_DIR = os.environ.get("SHARED_INDEX_DIR") or None
+
+# Fillable PDFs served by /api/fill (<form>.pdf or f<form>.pdf, as downloaded
+# by data.loader) and how many parsed templates stay in memory
+FILL_TEMPLATE_DIR = os.environ.get("FILL_TEMPLATE_DIR", os.path.join(BASE_DIR, "data", "pdfs"))
+FILL_TEMPLATE_CACHE_SIZE = int(os.environ.get("FILL_TEMPLATE_CACHE_SIZE", "32"))
+
+# Shared secret for /api/admin endpoints (sent as X-Admin-Token); while it is
+# unset the admin endpoints refuse every request
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
 # Global bot instance
 bot = None
 mode = "simple"
+response_cache = TTLCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+inference_executor = None
+inference_slots = asyncio.Semaphore(MAX_CONCURRENT_QUERIES)
+query_batcher = None
+template_registry = TemplateRegistry(FILL_TEMPLATE_DIR, FILL_TEMPLATE_CACHE_SIZE)
+
+# Startup runs in the background: the process is live immediately and
+# becomes ready once the model is warm and the index is built
+startup_status = {"stage": "starting", "model_loaded": False, "error": None}
+startup_task = None
+
+# Progress of the most recent background reload (see /api/admin/reload)
+reload_status = {"state": "idle"}
+reload_task = None
+
+
+def find_enhanced_data() -> Optional[str]:
+    """Path of the enhanced corpus, preferring JSONL over the legacy JSON file"""
+    for path in (ENHANCED_DATA_PATH, LEGACY_ENHANCED_DATA_PATH):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def create_bot(use_chunks: bool, embedder=None) -> RAGAccountantBot:
+    """Construct a bot with the configured caching, storage and ANN settings"""
+    return RAGAccountantBot(
+        use_chunks=use_chunks,
+        cache_dir=EMBEDDING_CACHE_DIR,
+        storage=EMBEDDING_STORAGE,
+        storage_dir=EMBEDDING_STORAGE_DIR,
+        ann_index=ANN_INDEX,
+        ann_min_docs=ANN_MIN_DOCS,
+        ann_n_lists=ANN_N_LISTS,
+        ann_n_probe=ANN_N_PROBE,
+        query_cache_size=QUERY_CACHE_SIZE,
+        hybrid_weight=HYBRID_WEIGHT,
+        embedder=embedder
+    )
+
+
+def load_bot(use_enhanced: bool, embedder=None, progress=None) -> Tuple[RAGAccountantBot, str]:
+    """
+    Build (or attach to) a fully indexed bot
+
+    With SHARED_INDEX_DIR set, the first worker builds the index and writes
+    it there; every worker then memory-maps the same files.
+
+    Args:
+        use_enhanced: Load enhanced PDF chunks if available, else simple metadata
+        embedder: Already-loaded model to reuse instead of loading a new one
+        progress: Optional callback receiving a short stage description
+
+    Returns:
+        (bot, mode)
+    """
+    if not SHARED_INDEX_DIR:
+        return build_bot_from_data(use_enhanced, embedder, progress)
+
+    enhanced_path = find_enhanced_data()
+    enhanced = use_enhanced and enhanced_path is not None
+    data_path = enhanced_path if enhanced else SIMPLE_DATA_PATH
+    data_stat = os.stat(data_path)
+    source_key = json.dumps([
+        data_path, data_stat.st_mtime_ns, data_stat.st_size, DEFAULT_MODEL_NAME,
+        EMBEDDING_STORAGE, ANN_INDEX, ANN_MIN_DOCS, ANN_N_LISTS, HYBRID_WEIGHT > 0
+    ])
+
+    report = progress or (lambda stage: None)
+    report("attaching shared index")
+    shared_bot = create_bot(use_chunks=enhanced, embedder=embedder)
+
+    def build():
+        built, _ = build_bot_from_data(enhanced, shared_bot.embedder, progress)
+        return built
+
+    build_or_attach(shared_bot, SHARED_INDEX_DIR, source_key, build)
+    return shared_bot, "enhanced" if enhanced else "simple"
+
+
+def build_bot_from_data(use_enhanced: bool, embedder=None, progress=None) -> Tuple[RAGAccountantBot, str]:
+    """
+    Load a data file and build a fully indexed bot in this process
+
+    Args:
+        use_enhanced: Load enhanced PDF chunks if available, else simple metadata
+        embedder: Already-loaded model to reuse instead of loading a new one
+        progress: Optional callback receiving a short stage description
+
+    Returns:
+        (bot, mode)
+    """
+    report = progress or (lambda stage: None)
+
+    # Check if enhanced data exists
+    enhanced_path = find_enhanced_data()
+    enhanced_exists = enhanced_path is not None
+
+    if use_enhanced and enhanced_exists:
+        print("Loading ENHANCED mode with PDF chunks...")
+        report("loading and indexing enhanced data")
+
+        # Documents stream from the corpus file straight into the bot's
+        # columnar store; no list of forms or documents is built first
+        counts = {}
+        new_bot = create_bot(use_chunks=True, embedder=embedder)
+        new_bot.add_documents(iter_enhanced_documents(enhanced_path, counts))
+
+        print(f"✓ Loaded {counts['forms']} forms with {counts['chunks']} chunks")
+        print(f"✓ Total searchable documents: {len(new_bot.documents)}")
+        return new_bot, "enhanced"
+
+    print("Loading SIMPLE mode (metadata only)...")
+    if use_enhanced and not enhanced_exists:
+        print(f"⚠ Enhanced data not found at {ENHANCED_DATA_PATH}")
+        print("  Run: python -m data.loader to process PDFs")
+
+    report("loading simple data")
+    irs_forms_raw = load_irs_forms(SIMPLE_DATA_PATH)
+    irs_forms = convert_to_bot_format(irs_forms_raw)
+    new_bot = create_bot(use_chunks=False, embedder=embedder)
+    report(f"indexing {len(irs_forms)} documents")
+    new_bot.add_documents(irs_forms)
+    print(f"✓ Loaded {len(irs_forms)} forms (metadata only)")
+    return new_bot, "simple"
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown"""
-    global bot, mode
+    global inference_executor, query_batcher, startup_task
 
     # Startup
     print("Starting IRS RAG Bot API...")
+    inference_executor = ThreadPoolExecutor(
+        max_workers=INFERENCE_WORKERS, thread_name_prefix="inference"
+    )
+    startup_task = asyncio.create_task(warm_start())
+
+    if MICRO_BATCH_WAIT_MS > 0:
+        query_batcher = MicroBatcher(
+            encode_query_batch,
+            max_batch_size=MICRO_BATCH_MAX_SIZE,
+            max_wait_ms=MICRO_BATCH_WAIT_MS
+        )
+        query_batcher.start()
+
+    yield
+
+    # Shutdown
+    print("Shutting down IRS RAG Bot API...")
+    if not startup_task.done():
+        startup_task.cancel()
+    if query_batcher is not None:
+        await query_batcher.stop()
+        query_batcher = None
+    inference_executor.shutdown(wait=True)
+
+
+async def warm_start():
+    """Load and warm the model, then build the index, without blocking the server"""
+    global bot, mode
+
+    def progress(stage: str):
+        startup_status["stage"] = stage
 
     try:
-        # Check if enhanced data exists
-        enhanced_exists = os.path.exists(ENHANCED_DATA_PATH)
-
-        if USE_ENHANCED_MODE and enhanced_exists:
-            print("Loading ENHANCED mode with PDF chunks...")
-            with open(ENHANCED_DATA_PATH, 'r') as f:
-                enhanced_forms = json.load(f)
-
-            bot_documents = convert_enhanced_to_bot_format(enhanced_forms)
-            bot = RAGAccountantBot(use_chunks=True)
-            bot.add_documents(bot_documents)
-            mode = "enhanced"
-
-            total_chunks = sum(len(f.get('chunks', [])) for f in enhanced_forms)
-            print(f"✓ Loaded {len(enhanced_forms)} forms with {total_chunks} chunks")
-            print(f"✓ Total searchable documents: {len(bot_documents)}")
-
-        else:
-            print("Loading SIMPLE mode (metadata only)...")
-            if USE_ENHANCED_MODE and not enhanced_exists:
-                print(f"⚠ Enhanced data not found at {ENHANCED_DATA_PATH}")
-                print("  Run: python -m data.loader to process PDFs")
-
-            irs_forms_raw = load_irs_forms(SIMPLE_DATA_PATH)
-            irs_forms = convert_to_bot_format(irs_forms_raw)
-            bot = RAGAccountantBot(use_chunks=False)
-            bot.add_documents(irs_forms)
-            mode = "simple"
-            print(f"✓ Loaded {len(irs_forms)} forms (metadata only)")
+        progress("loading model")
+        embedder = await asyncio.to_thread(load_embedder, DEFAULT_MODEL_NAME)
+        startup_status["model_loaded"] = True
+
+        bot, mode = await asyncio.to_thread(load_bot, USE_ENHANCED_MODE, embedder, progress)
+        progress("ready")
 
         print(f"✓ API ready at http://localhost:8000")
         print(f"  Mode: {mode}")
         print(f"  Docs: http://localhost:8000/docs")
 
     except Exception as e:
+        startup_status.update({"stage": "failed", "error": str(e)})
         print(f"✗ Error loading bot: {e}")
-        raise
 
-    yield
 
-    # Shutdown
-    print("Shutting down IRS RAG Bot API...")
+async def run_inference(func, *args, **kwargs):
+    """
+    Run a blocking bot call on the inference pool
+
+    At most MAX_CONCURRENT_QUERIES calls are admitted at once; the pool runs
+    INFERENCE_WORKERS of them in parallel and the rest wait their turn.
+    """
+    async with inference_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            inference_executor, functools.partial(func, *args, **kwargs)
+        )
+
+
+async def encode_query_batch(queries: List[str]):
+    """Micro-batcher callback: encode coalesced queries in one model call"""
+    return await run_inference(bot.encode_queries, queries)
+
+
+def query_cache_key(current_bot: RAGAccountantBot, request: "QueryRequest") -> tuple:
+    """Responses depend only on the request and the loaded corpus"""
+    return (
+        current_bot.index_version,
+        request.query,
+        request.use_generation,
+        request.top_k,
+        request.form_number,
+        request.type
+    )
+
+
+async def prepare_query(current_bot: RAGAccountantBot, request: "QueryRequest") -> Tuple[Optional[List[Dict]], Optional[np.ndarray]]:
+    """
+    Resolve the exact-match fast path once, or encode the query through the
+    micro-batcher
+
+    Returns (exact matches, query embedding), at most one of them set; both
+    are None when batching is disabled and the bot does both steps itself.
+    Passing them on to the bot keeps it from running exact_match again.
+    """
+    if query_batcher is None:
+        return None, None
+    exact = current_bot.exact_match(request.query, request.top_k, request.form_number, request.type)
+    if exact is not None:
+        return exact, None
+    return None, await query_batcher.submit(request.query)
 
 
 # Initialize FastAPI app with lifespan
@@ -107,19 +347,43 @@ app.add_middleware(
 )
 
 
+class ReloadRequest(BaseModel):
+    mode: Optional[Literal["simple", "enhanced"]] = None
+
+
 class QueryRequest(BaseModel):
     query: str
     use_generation: bool = True
-    top_k: int = 5
+    top_k: int = Field(5, ge=1, le=100)
+    form_number: Optional[str] = None
+    type: Optional[str] = None
+
+
+class BatchQueryRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=1000)
+    use_generation: bool = True
+    top_k: int = Field(5, ge=1, le=100)
+    form_number: Optional[str] = None
+    type: Optional[str] = None
+
+
+class FillRequest(BaseModel):
+    # Values keyed by fully qualified field name (see /api/fill/{form}/fields)
+    fields: Dict[str, Union[str, int, float, None]]
 
 
 class RelevantFile(BaseModel):
     filename: str
     content: str
+    # Dense cosine similarity; score is the ranking value (similarity plus
+    # HYBRID_WEIGHT * BM25 when hybrid scoring is on)
     similarity: float
+    score: Optional[float] = None
     form_number: Optional[str] = None
     type: Optional[str] = None
     page: Optional[int] = None
+    # Every page the text appears on (repeated chunks are collapsed into one)
+    pages: Optional[List[int]] = None
     line_number: Optional[str] = None
 
 
@@ -131,8 +395,17 @@ class QueryResponse(BaseModel):
     mode: str
 
 
+class BatchQueryResponse(BaseModel):
+    results: List[QueryResponse]
+    total_documents: int
+    mode: str
+
+
 class HealthResponse(BaseModel):
     status: str
+    live: bool
+    ready: bool
+    stage: str
     model_loaded: bool
     total_documents: int
     mode: str
@@ -140,26 +413,54 @@ class HealthResponse(BaseModel):
 
 
 @app.get("/", response_model=HealthResponse)
-async def root():
-    """Health check and status endpoint"""
-    if bot is None:
-        raise HTTPException(status_code=503, detail="Bot not loaded")
+async def root(response: Response):
+    """
+    Health and startup status
 
-    enhanced_exists = os.path.exists(ENHANCED_DATA_PATH)
+    Answers 503 (with the same body) until the model is warm and the index is
+    built, so load balancers pointed at / or /health keep traffic away from
+    workers that are still starting; /health/live is the probe that stays
+    200 during startup.
+    """
+    current_bot = bot
+    ready = current_bot is not None
+    failed = startup_status["stage"] == "failed"
+    enhanced_exists = find_enhanced_data() is not None
+    if not ready:
+        response.status_code = 503
 
     return {
-        "status": "healthy",
-        "model_loaded": bot is not None,
-        "total_documents": len(bot.documents) if bot else 0,
+        "status": "healthy" if ready else ("failed" if failed else "starting"),
+        "live": not failed,
+        "ready": ready,
+        "stage": startup_status["stage"],
+        "model_loaded": startup_status["model_loaded"],
+        "total_documents": len(current_bot.documents) if ready else 0,
         "mode": mode,
         "enhanced_available": enhanced_exists
     }
 
 
 @app.get("/health", response_model=HealthResponse)
-async def health_check():
+async def health_check(response: Response):
     """Alias for root health check"""
-    return await root()
+    return await root(response)
+
+
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: fails only if startup failed and the pod should be restarted"""
+    if startup_status["stage"] == "failed":
+        raise HTTPException(status_code=503, detail=f"Startup failed: {startup_status['error']}")
+    return {"status": "alive", "stage": startup_status["stage"]}
+
+
+@app.get("/health/ready")
+async def readiness():
+    """Readiness probe: 200 once the model is warm and the index is built"""
+    if bot is None:
+        raise HTTPException(status_code=503, detail=f"Not ready: {startup_status['stage']}")
+    return {"status": "ready", "mode": mode}
 
 
 @app.post("/api/query", response_model=QueryResponse)
@@ -170,51 +471,189 @@ async def query_bot(request: QueryRequest):
     In enhanced mode, searches both form metadata and PDF content chunks.
     In simple mode, searches only form metadata.
     """
-    if bot is None:
+    # Snapshot the serving bot: a reload may swap the global while we await
+    current_bot, current_mode = bot, mode
+    if current_bot is None:
         raise HTTPException(status_code=503, detail="Bot not initialized")
 
+    cache_key = query_cache_key(current_bot, request)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
-        result = bot.query(
+        exact_matches, query_embedding = await prepare_query(current_bot, request)
+
+        result = await run_inference(
+            current_bot.query,
             user_query=request.query,
-            use_generation=request.use_generation
+            use_generation=request.use_generation,
+            top_k=request.top_k,
+            form_number=request.form_number,
+            doc_type=request.type,
+            query_embedding=query_embedding,
+            exact_matches=exact_matches
         )
 
-        # Limit to top_k results
-        relevant_files = result['relevant_files'][:request.top_k]
-
-        return {
+        response = {
             "query": request.query,
             "answer": result['answer'],
-            "relevant_files": relevant_files,
-            "total_documents": len(bot.documents),
-            "mode": mode
+            "relevant_files": result['relevant_files'],
+            "total_documents": len(current_bot.documents),
+            "mode": current_mode
         }
+        response_cache.put(cache_key, response)
+        return response
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
 
 
+@app.post("/api/query/stream")
+async def query_bot_stream(request: QueryRequest, format: Literal["sse", "ndjson"] = "sse"):
+    """
+    Streaming variant of /api/query
+
+    Sends three events, each as soon as it is ready: ``retrieval`` (the
+    ranked relevant_files with query, total_documents and mode), ``answer``
+    and ``done`` (timings in ms). A failure after the stream has started
+    arrives as an ``error`` event instead of an HTTP status.
+
+    format=sse emits Server-Sent Events; format=ndjson emits one
+    ``{"event": ..., "data": ...}`` object per line.
+    """
+    current_bot, current_mode = bot, mode
+    if current_bot is None:
+        raise HTTPException(status_code=503, detail="Bot not initialized")
+
+    if format == "sse":
+        media_type = "text/event-stream"
+        encode = lambda event, data: f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    else:
+        media_type = "application/x-ndjson"
+        encode = lambda event, data: json.dumps({"event": event, "data": data}) + "\n"
+
+    async def body():
+        async for event, data in stream_query_events(current_bot, current_mode, request):
+            yield encode(event, data)
+
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        # Keep proxies from buffering the early events
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def stream_query_events(current_bot, current_mode: str, request: QueryRequest) -> AsyncIterator[Tuple[str, Dict]]:
+    """Yield (event, data) pairs for one streamed query"""
+    started = time.perf_counter()
+
+    cache_key = query_cache_key(current_bot, request)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        yield "retrieval", {key: value for key, value in cached.items() if key != "answer"}
+        yield "answer", {"answer": cached["answer"]}
+        yield "done", {"cached": True, "timing": {"total_ms": (time.perf_counter() - started) * 1000.0}}
+        return
+
+    try:
+        exact_matches, query_embedding = await prepare_query(current_bot, request)
+        relevant_files = await run_inference(
+            current_bot.find_relevant_files,
+            request.query,
+            top_k=request.top_k,
+            form_number=request.form_number,
+            doc_type=request.type,
+            query_embedding=query_embedding,
+            exact_matches=exact_matches
+        )
+        retrieved = time.perf_counter()
+
+        response = {
+            "query": request.query,
+            "relevant_files": relevant_files,
+            "total_documents": len(current_bot.documents),
+            "mode": current_mode
+        }
+        yield "retrieval", response
+
+        answer = await run_inference(
+            current_bot.build_answer, request.query, relevant_files, request.use_generation
+        )
+        answered = time.perf_counter()
+        yield "answer", {"answer": answer}
+
+    except Exception as e:
+        yield "error", {"detail": f"Query failed: {str(e)}"}
+        return
+
+    response_cache.put(cache_key, {"query": request.query, "answer": answer, **response})
+    yield "done", {
+        "cached": False,
+        "timing": {
+            "retrieval_ms": (retrieved - started) * 1000.0,
+            "answer_ms": (answered - retrieved) * 1000.0,
+            "total_ms": (answered - started) * 1000.0
+        }
+    }
+
+
+@app.post("/api/query/batch", response_model=BatchQueryResponse)
+async def query_bot_batch(request: BatchQueryRequest):
+    """
+    Query the RAG bot with many questions at once
+
+    All questions are encoded in one model call and scored with a single
+    matrix product; each still gets its own templated answer.
+    """
+    current_bot, current_mode = bot, mode
+    if current_bot is None:
+        raise HTTPException(status_code=503, detail="Bot not initialized")
+
+    try:
+        results = await run_inference(
+            current_bot.query_batch,
+            user_queries=request.queries,
+            use_generation=request.use_generation,
+            top_k=request.top_k,
+            form_number=request.form_number,
+            doc_type=request.type
+        )
+
+        total_documents = len(current_bot.documents)
+        return {
+            "results": [
+                {
+                    "query": query,
+                    "answer": result['answer'],
+                    "relevant_files": result['relevant_files'],
+                    "total_documents": total_documents,
+                    "mode": current_mode
+                }
+                for query, result in zip(request.queries, results)
+            ],
+            "total_documents": total_documents,
+            "mode": current_mode
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch query failed: {str(e)}")
+
+
 @app.get("/api/forms")
 async def list_forms():
     """List all available forms"""
     if bot is None:
         raise HTTPException(status_code=503, detail="Bot not initialized")
 
-    # Get unique form numbers
-    unique_forms = {}
-    for doc in bot.documents:
-        form_num = doc.get('form_number')
-        if form_num and form_num not in unique_forms:
-            unique_forms[form_num] = {
-                "form_number": form_num,
-                "filename": doc['filename']
-            }
+    forms = bot.form_index.list_forms()
 
     return {
-        "total": len(bot.documents),
-        "unique_forms": len(unique_forms),
+        "total": bot.form_index.total_documents,
+        "unique_forms": len(forms),
         "mode": mode,
-        "forms": list(unique_forms.values())
+        "forms": forms
     }
 
 
@@ -224,48 +663,187 @@ async def get_form_details(form_number: str):
     if bot is None:
         raise HTTPException(status_code=503, detail="Bot not initialized")
 
-    # Find all documents for this form
-    form_docs = [
-        doc for doc in bot.documents
-        if doc.get('form_number') == form_number
-    ]
-
-    if not form_docs:
+    details = bot.form_index.details(form_number)
+    if details is None:
         raise HTTPException(status_code=404, detail=f"Form {form_number} not found")
 
-    # Organize by type
-    metadata_docs = [d for d in form_docs if d.get('type') == 'metadata']
-    chunk_docs = [d for d in form_docs if d.get('type') != 'metadata']
+    return details
+
+
+@app.get("/api/stats")
+async def get_stats():
+    """Cache statistics for the query path"""
+    if bot is None:
+        raise HTTPException(status_code=503, detail="Bot not initialized")
 
+    return {
+        "mode": mode,
+        "query_embedding_cache": bot.query_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "micro_batching": query_batcher.stats() if query_batcher is not None else None,
+        "fill_templates": template_registry.stats()
+    }
+
+
+async def get_template(form_number: str):
+    """Parsed template from the registry (parsed off the event loop on a miss)"""
+    try:
+        return await asyncio.to_thread(template_registry.get, form_number)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No fillable PDF for form {form_number}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not load form {form_number}: {str(e)}")
+
+
+@app.get("/api/fill")
+async def list_fillable_forms():
+    """Form numbers that can be filled"""
+    return {"forms": template_registry.available()}
+
+
+@app.get("/api/fill/{form_number}/fields")
+async def get_fill_fields(form_number: str):
+    """Field catalog of a fillable form: name -> page and field type"""
+    template = await get_template(form_number)
     return {
         "form_number": form_number,
-        "total_documents": len(form_docs),
-        "has_chunks": len(chunk_docs) > 0,
-        "metadata": metadata_docs[0] if metadata_docs else None,
-        "chunks": {
-            "total": len(chunk_docs),
-            "by_type": {
-                "line_items": len([d for d in chunk_docs if d.get('type') == 'line_item']),
-                "sections": len([d for d in chunk_docs if d.get('type') == 'section_header']),
-                "instructions": len([d for d in chunk_docs if d.get('type') == 'instruction'])
-            },
-            "preview": chunk_docs[:5] if chunk_docs else []
-        }
+        "pages": template.page_count,
+        "fields": template.fields
     }
 
 
+@app.post("/api/fill/{form_number}")
+async def fill_form(form_number: str, request: FillRequest):
+    """
+    Fill a form and stream back the PDF
+
+    The template comes from the in-memory registry, so only the first
+    request for a form (or the first after its eviction) reads the file.
+    Field names not in the form's catalog are rejected with 422.
+    """
+    template = await get_template(form_number)
+
+    values = {}
+    for name, value in request.fields.items():
+        text = format_value(value)
+        if text is not None:
+            values[name] = text
+
+    unknown = sorted(name for name in values if name not in template.fields)
+    if unknown:
+        raise HTTPException(status_code=422, detail={"message": "Unknown fields", "fields": unknown})
+
+    try:
+        pdf_bytes, _ = await asyncio.to_thread(template.fill, values)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Fill failed: {str(e)}")
+
+    def body():
+        view = memoryview(pdf_bytes)
+        for start in range(0, len(view), 64 * 1024):
+            yield bytes(view[start:start + 64 * 1024])
+
+    return StreamingResponse(
+        body(),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f'attachment; filename="{form_number}_filled.pdf"',
+            "Content-Length": str(len(pdf_bytes))
+        }
+    )
+
+
 @app.post("/api/switch_mode")
 async def switch_mode():
-    """Switch between simple and enhanced mode (requires restart)"""
-    enhanced_exists = os.path.exists(ENHANCED_DATA_PATH)
+    """Report whether a switch to enhanced mode is possible (use /api/admin/reload to switch)"""
+    enhanced_exists = find_enhanced_data() is not None
 
     return {
         "current_mode": mode,
         "can_switch_to_enhanced": enhanced_exists,
-        "message": "Set USE_ENHANCED_MODE=true environment variable and restart to switch modes" if enhanced_exists else "Enhanced data not available. Run: python -m data.loader"
+        "message": "POST /api/admin/reload with {\"mode\": \"enhanced\"} to switch without a restart" if enhanced_exists else "Enhanced data not available. Run: python -m data.loader"
     }
 
 
+def check_admin_token(token: Optional[str]):
+    """Admin endpoints require X-Admin-Token to match ADMIN_TOKEN; they are disabled when it is unset"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (set ADMIN_TOKEN to enable them)")
+    if token is None or not secrets.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8')):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+async def reload_bot(target_mode: str):
+    """
+    Build a new bot in the background and swap it in atomically
+
+    Queries already running keep the bot they started with; new requests
+    see the new one as soon as the global is reassigned.
+    """
+    global bot, mode
+
+    def progress(stage: str):
+        reload_status["stage"] = stage
+
+    try:
+        old_bot = bot
+        embedder = old_bot.embedder if old_bot is not None else None
+        new_bot, new_mode = await asyncio.to_thread(
+            load_bot, target_mode == "enhanced", embedder, progress
+        )
+
+        # Same model, so warm query embeddings carry over
+        if old_bot is not None and old_bot.model_name == new_bot.model_name:
+            new_bot.query_cache = old_bot.query_cache
+
+        bot, mode = new_bot, new_mode
+        response_cache.clear()
+
+        reload_status.update({
+            "state": "done",
+            "stage": "swapped",
+            "mode": new_mode,
+            "total_documents": len(new_bot.documents),
+            "finished_at": time.time()
+        })
+        print(f"✓ Reloaded in {new_mode} mode ({len(new_bot.documents)} documents)")
+
+    except Exception as e:
+        reload_status.update({"state": "failed", "error": str(e), "finished_at": time.time()})
+        print(f"✗ Reload failed, still serving previous index: {e}")
+
+
+@app.post("/api/admin/reload", status_code=202)
+async def start_reload(request: Optional[ReloadRequest] = None, x_admin_token: Optional[str] = Header(None)):
+    """Rebuild the corpus and index in the background, then swap it in"""
+    global reload_task
+    check_admin_token(x_admin_token)
+
+    if bot is None:
+        raise HTTPException(status_code=503, detail="Startup still in progress")
+
+    if reload_task is not None and not reload_task.done():
+        raise HTTPException(status_code=409, detail="A reload is already running")
+
+    target_mode = (request.mode if request else None) or mode
+    reload_status.clear()
+    reload_status.update({
+        "state": "running",
+        "stage": "starting",
+        "target_mode": target_mode,
+        "started_at": time.time()
+    })
+    reload_task = asyncio.create_task(reload_bot(target_mode))
+    return reload_status
+
+
+@app.get("/api/admin/reload")
+async def get_reload_status(x_admin_token: Optional[str] = Header(None)):
+    """Progress of the current or most recent reload"""
+    check_admin_token(x_admin_token)
+    return reload_status
+
+
 # Allow running directly with python app.py
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,184 @@
+"""
+Microbenchmark: single-pass page segmenter vs the original three regex
+extractors, on synthetic instruction booklets and optionally real PDFs
+Location: backend/benchmarks/bench_segmenter.py
+
+Run from backend/:
+    python -m benchmarks.bench_segmenter [--pages 400] [--repeat 5] [pdf ...]
+"""
+
+import argparse
+import random
+import re
+import time
+from typing import Callable, Dict, List
+
+from data.segmenter import segment_page
+
+
+# Reference implementation: the extractors data.loader used before the
+# segmenter, kept verbatim to check output equality and measure the speedup
+
+def regex_line_items(text: str, page_num: int) -> List[Dict]:
+    """Extract line items from form text"""
+    chunks = []
+
+    # Pattern for line items like "1  Wages, salaries, tips..."
+    pattern = r'^(\d+[a-z]?)\s+([A-Z].*?)(?=\n\d+[a-z]?\s|\n{2,}|$)'
+    matches = re.finditer(pattern, text, re.MULTILINE)
+
+    for match in matches:
+        line_num = match.group(1)
+        line_text = match.group(2).strip()
+
+        if len(line_text) > 10:
+            chunks.append({
+                "type": "line_item",
+                "line_number": line_num,
+                "text": line_text,
+                "page": page_num
+            })
+
+    return chunks
+
+
+def regex_sections(text: str, page_num: int) -> List[Dict]:
+    """Extract section headers"""
+    chunks = []
+
+    # Pattern for section headers: ALL CAPS text
+    pattern = r'^([A-Z][A-Z\s]{9,})$'
+    matches = re.finditer(pattern, text, re.MULTILINE)
+
+    for match in matches:
+        section_text = match.group(1).strip()
+
+        # Filter out common false positives
+        if section_text not in ['OMB NO', 'DEPARTMENT OF THE TREASURY']:
+            chunks.append({
+                "type": "section_header",
+                "text": section_text,
+                "page": page_num
+            })
+
+    return chunks
+
+
+def regex_instructions(text: str, page_num: int) -> List[Dict]:
+    """Extract instruction paragraphs"""
+    chunks = []
+
+    # Split by double newlines to get paragraphs
+    paragraphs = re.split(r'\n{2,}', text)
+
+    for para in paragraphs:
+        para = para.strip()
+
+        # Keep substantial paragraphs
+        if len(para) > 50 and len(para.split()) > 8:
+            # Check if it references a line number
+            line_ref = re.search(r'[Ll]ine\s+(\d+[a-z]?)', para)
+
+            chunks.append({
+                "type": "instruction",
+                "text": para,
+                "page": page_num,
+                "line_reference": line_ref.group(1) if line_ref else None
+            })
+
+    return chunks
+
+
+def regex_segment_page(text: str, page_num: int):
+    return (
+        regex_line_items(text, page_num),
+        regex_sections(text, page_num),
+        regex_instructions(text, page_num)
+    )
+
+
+_WORDS = (
+    "income tax return credit deduction amount enter the total from schedule "
+    "attach form if you are filing jointly spouse dependent wages salaries tips "
+    "qualified business employer payments estimated refund penalty interest"
+).split()
+
+
+def synthetic_page(rng: random.Random, n_blocks: int = 40) -> str:
+    """Page text shaped like an IRS instruction booklet"""
+    parts = []
+    for block in range(n_blocks):
+        kind = rng.random()
+        if kind < 0.1:
+            parts.append(' '.join(rng.choice(_WORDS).upper() for _ in range(rng.randint(2, 5))))
+        elif kind < 0.5:
+            number = f"{rng.randint(1, 40)}{rng.choice(['', 'a', 'b'])}"
+            words = ' '.join(rng.choice(_WORDS) for _ in range(rng.randint(4, 14)))
+            parts.append(f"{number} {words.capitalize()}")
+        else:
+            sentences = []
+            for _ in range(rng.randint(2, 6)):
+                words = ' '.join(rng.choice(_WORDS) for _ in range(rng.randint(6, 18)))
+                if rng.random() < 0.3:
+                    words += f" on line {rng.randint(1, 40)}"
+                sentences.append(words.capitalize() + '.')
+            parts.append('\n'.join(sentences))
+        parts.append('\n\n' if rng.random() < 0.5 else '\n')
+    return ''.join(parts)
+
+
+def pdf_pages(path: str) -> List[str]:
+    import PyPDF2
+
+    with open(path, 'rb') as f:
+        return [page.extract_text() for page in PyPDF2.PdfReader(f).pages]
+
+
+def time_segmenter(func: Callable, pages: List[str], repeat: int) -> float:
+    """Best wall time over repeat runs of func over every page"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for page_num, text in enumerate(pages, start=1):
+            func(text, page_num)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(name: str, pages: List[str], repeat: int) -> Dict:
+    identical = all(
+        segment_page(text, page_num) == regex_segment_page(text, page_num)
+        for page_num, text in enumerate(pages, start=1)
+    )
+    old = time_segmenter(regex_segment_page, pages, repeat)
+    new = time_segmenter(segment_page, pages, repeat)
+    size_mb = sum(len(text) for text in pages) / 1e6
+
+    print(f"{name}: {len(pages)} pages, {size_mb:.1f} MB of text")
+    print(f"  regex extractors: {old * 1000:8.1f} ms  ({size_mb / old:6.1f} MB/s)")
+    print(f"  segment_page:     {new * 1000:8.1f} ms  ({size_mb / new:6.1f} MB/s)")
+    print(f"  speedup {old / new:.2f}x, output {'identical' if identical else 'DIFFERENT'}")
+    return {'identical': identical, 'speedup': old / new}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('pdfs', nargs='*', help="PDFs whose extracted text is also benchmarked")
+    parser.add_argument('--pages', type=int, default=400, help="Pages in the synthetic booklet")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per timing (best is reported)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    run("synthetic booklet", [synthetic_page(rng) for _ in range(args.pages)], args.repeat)
+
+    # Long unbroken page: the shape where the lazy line item pattern was slowest
+    long_page = '\n'.join(synthetic_page(rng) for _ in range(args.pages // 10 or 1))
+    run("single long page", [long_page], args.repeat)
+
+    for path in args.pdfs:
+        run(path, pdf_pages(path), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+On-disk cache of per-PDF chunking results
+Location: backend/data/chunk_cache.py
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+from models.atomic_file import atomic_write
+
+
+def file_digest(path: str) -> str:
+    """sha256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ChunkCache:
+    """
+    Maps (PDF content hash, extractor version) to the chunks extracted from it
+
+    One JSON file per entry, named v<version>-<sha256>.json, so a form is
+    only re-chunked when its PDF bytes or the chunking code change. Chunk IDs
+    are not part of the cached data; they are assigned per form on load.
+    """
+
+    def __init__(self, cache_dir: str, extractor_version: int):
+        self.cache_dir = cache_dir
+        self.extractor_version = extractor_version
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, f"v{self.extractor_version}-{digest}.json")
+
+    def get(self, digest: str) -> Optional[List[Dict]]:
+        """Cached chunks for a PDF, or None on a miss (or unreadable entry)"""
+        try:
+            with open(self._path(digest), 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('extractor_version') != self.extractor_version or entry.get('sha256') != digest:
+            return None
+        return entry['chunks']
+
+    def put(self, digest: str, chunks: List[Dict]):
+        """Store chunks for a PDF (written atomically)"""
+        entry = {
+            'extractor_version': self.extractor_version,
+            'sha256': digest,
+            'chunks': [{k: v for k, v in chunk.items() if k != 'chunk_id'} for chunk in chunks]
+        }
+        with atomic_write(self._path(digest), 'w') as f:
+            json.dump(entry, f)
+
+    def prune(self, keep: set) -> int:
+        """Delete entries from other extractor versions or for digests not in keep"""
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        keep_names = {os.path.basename(self._path(digest)) for digest in keep}
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.json') and name.startswith('v') and name not in keep_names:
+                os.remove(os.path.join(self.cache_dir, name))
+                removed += 1
+        return removed
@@ -0,0 +1,71 @@
+"""
+Streaming JSONL format for the enhanced (PDF chunk) corpus
+Location: backend/data/corpus.py
+"""
+
+import json
+from typing import Dict, Iterable, Iterator, Tuple
+
+from models.atomic_file import atomic_write
+
+
+CORPUS_FORMAT = 'irs-forms-enhanced'
+CORPUS_FORMAT_VERSION = 1
+
+_COMPACT = (',', ':')
+
+
+def write_enhanced_corpus(path: str, forms: Iterable[Dict]) -> Tuple[int, int]:
+    """
+    Write enhanced forms as JSONL, atomically
+
+    The file starts with a header line, then each form is one
+    {"kind": "form", ...} line (its fields minus "chunks") followed by one
+    {"kind": "chunk", ...} line per chunk. Nothing is indented and forms are
+    written as they come, so forms may be a generator. The data goes to a
+    temporary file that replaces path only once complete.
+
+    Returns:
+        (number of forms, number of chunks) written
+    """
+    n_forms = n_chunks = 0
+    with atomic_write(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'format': CORPUS_FORMAT, 'version': CORPUS_FORMAT_VERSION}) + '\n')
+        for form in forms:
+            record = {key: value for key, value in form.items() if key != 'chunks'}
+            f.write(json.dumps({'kind': 'form', **record}, separators=_COMPACT) + '\n')
+            n_forms += 1
+            for chunk in form.get('chunks', []):
+                f.write(json.dumps({'kind': 'chunk', **chunk}, separators=_COMPACT) + '\n')
+                n_chunks += 1
+
+    return n_forms, n_chunks
+
+
+def iter_corpus_records(path: str) -> Iterator[Tuple[str, Dict]]:
+    """
+    Yield (kind, record) pairs from an enhanced corpus file, one line at a time
+
+    A legacy .json file (one indented array of forms) is also accepted; it
+    has to be parsed whole, but yields the same sequence of records.
+    """
+    if not path.endswith('.jsonl'):
+        with open(path, 'r') as f:
+            forms = json.load(f)
+        for form in forms:
+            yield 'form', {key: value for key, value in form.items() if key != 'chunks'}
+            for chunk in form.get('chunks', []):
+                yield 'chunk', chunk
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        header = json.loads(f.readline() or '{}')
+        if header.get('format') != CORPUS_FORMAT or header.get('version') != CORPUS_FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {CORPUS_FORMAT_VERSION} enhanced corpus")
+
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield record.pop('kind'), record
+
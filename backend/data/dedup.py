@@ -0,0 +1,168 @@
+"""
+Exact and near-duplicate chunk collapse (normalized hash + MinHash/LSH)
+Location: backend/data/dedup.py
+"""
+
+import hashlib
+import re
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+SHINGLE_WORDS = 2
+NUM_PERM = 64
+LSH_BANDS = 16
+# Estimated Jaccard similarity above which two chunks count as the same text
+NEAR_DUP_THRESHOLD = 0.8
+# Shorter chunks (headers, short line items) are only collapsed when identical
+MIN_NEAR_DUP_WORDS = 8
+
+_MERSENNE_PRIME = np.uint64(4294967291)  # largest prime below 2**32
+_WORD = re.compile(r'\w+')
+_DIGITS = re.compile(r'\d')
+# Running page numbers ("Page 3", "page 2 of 6") and revision dates
+# ("(Rev. December 2023)", "Rev. 12-2023"): the only numbers that may differ
+# between copies of the same text
+_BOILERPLATE_NUMBERS = re.compile(
+    r'\bpage\s+\d+(?:\s+of\s+\d+)?\b'
+    r'|\brev(?:ised|\.)?\s*(?:[a-z]+\.?\s+\d{4}|\d{1,2}[-/]\d{2,4}|\d{4})\b',
+    re.IGNORECASE
+)
+
+
+def _permutations(num_perm: int, seed: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.int64).astype(np.uint64)
+    b = rng.randint(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.int64).astype(np.uint64)
+    return a, b
+
+
+_PERM_A, _PERM_B = _permutations(NUM_PERM)
+
+
+def normalize_text(text: str) -> List[str]:
+    """Case-folded word tokens; punctuation and spacing differences are ignored"""
+    return _WORD.findall(text.casefold())
+
+
+def minhash_signature(words: List[str], shingle_words: int = SHINGLE_WORDS) -> np.ndarray:
+    """NUM_PERM-value MinHash of the word shingles of a chunk"""
+    if len(words) <= shingle_words:
+        shingles = {' '.join(words)}
+    else:
+        shingles = {' '.join(words[i:i + shingle_words]) for i in range(len(words) - shingle_words + 1)}
+
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles)
+    )
+    # (a * x + b) mod p stays below 2**64 since a, b < p < 2**32 and x < 2**32
+    permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % _MERSENNE_PRIME
+    return permuted.min(axis=1)
+
+
+def dedupe_chunks(
+    chunks: List[Dict],
+    threshold: float = NEAR_DUP_THRESHOLD,
+    bands: int = LSH_BANDS
+) -> Tuple[List[Dict], Dict[str, int]]:
+    """
+    Collapse repeated chunks of one form into their first occurrence
+
+    Chunks are only compared with chunks of the same type and the same line
+    (line number of a line item, line reference of an instruction), so
+    "Enter on line 5" never absorbs "Enter on line 6". Exact duplicates are
+    found by hashing the normalized text; near duplicates by MinHash
+    signatures bucketed with LSH (bands x rows) and confirmed against the
+    similarity threshold. Page numbers and revision dates are ignored for
+    near duplicates, but every other number (amounts, percentages, years,
+    line references) must match exactly, so "more than $25,000" never
+    absorbs "more than $75,000". Every surviving chunk gets a
+    sorted "pages" list covering all of its copies (a single page if it had
+    none).
+
+    Returns:
+        (kept chunks in original order, stats) where stats has chunks_in,
+        exact_duplicates, near_duplicates and chunks_out
+    """
+    rows = NUM_PERM // bands
+    kept: List[Dict] = []
+    pages: List[set] = []
+    exact_index: Dict[Tuple, int] = {}
+    band_index: Dict[Tuple, List[int]] = {}
+    signatures: Dict[int, np.ndarray] = {}
+    stats = {'chunks_in': len(chunks), 'exact_duplicates': 0, 'near_duplicates': 0}
+
+    for chunk in chunks:
+        group = _group_key(chunk)
+        words = normalize_text(chunk.get('text', ''))
+
+        key = (group, hashlib.sha1(' '.join(words).encode('utf-8')).digest())
+        target: Optional[int] = exact_index.get(key)
+        if target is not None:
+            stats['exact_duplicates'] += 1
+        elif len(words) >= MIN_NEAR_DUP_WORDS:
+            near_words = normalize_text(_BOILERPLATE_NUMBERS.sub(' ', chunk.get('text', '')))
+            numbers = tuple(word for word in near_words if _DIGITS.search(word))
+            signature = minhash_signature(near_words)
+            # Bucketing on the numbers only lets chunks with the same numbers collide
+            band_keys = [
+                (group, numbers, band, signature[band * rows:(band + 1) * rows].tobytes())
+                for band in range(bands)
+            ]
+            target = _best_candidate(signature, band_keys, band_index, signatures, threshold)
+            if target is not None:
+                stats['near_duplicates'] += 1
+            else:
+                signatures[len(kept)] = signature
+                for band_key in band_keys:
+                    band_index.setdefault(band_key, []).append(len(kept))
+
+        if target is not None:
+            exact_index.setdefault(key, target)
+            if chunk.get('page') is not None:
+                pages[target].add(chunk['page'])
+            continue
+
+        exact_index[key] = len(kept)
+        kept.append(dict(chunk))
+        pages.append({chunk['page']} if chunk.get('page') is not None else set())
+
+    for chunk, chunk_pages in zip(kept, pages):
+        if chunk_pages:
+            chunk['pages'] = sorted(chunk_pages)
+
+    stats['chunks_out'] = len(kept)
+    return kept, stats
+
+
+def _group_key(chunk: Dict) -> Tuple:
+    chunk_type = chunk.get('type')
+    if chunk_type == 'line_item':
+        return chunk_type, chunk.get('line_number')
+    if chunk_type == 'instruction':
+        return chunk_type, chunk.get('line_reference')
+    return chunk_type, None
+
+
+def _best_candidate(
+    signature: np.ndarray,
+    band_keys: List[Tuple],
+    band_index: Dict[Tuple, List[int]],
+    signatures: Dict[int, np.ndarray],
+    threshold: float
+) -> Optional[int]:
+    """Most similar earlier chunk sharing an LSH band, if similar enough"""
+    candidates = set()
+    for band_key in band_keys:
+        candidates.update(band_index.get(band_key, ()))
+
+    best, best_similarity = None, threshold
+    for candidate in sorted(candidates):
+        similarity = float(np.mean(signatures[candidate] == signature))
+        if similarity >= best_similarity and (best is None or similarity > best_similarity):
+            best, best_similarity = candidate, similarity
+    return best
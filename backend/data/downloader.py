@@ -0,0 +1,163 @@
+"""
+Concurrent PDF downloader with pooled connections and conditional GETs
+Location: backend/data/downloader.py
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from models.atomic_file import atomic_write
+
+
+MANIFEST_FILE = 'manifest.json'
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def make_session(pool_size: int = 8, retries: int = 3, backoff: float = 0.5) -> requests.Session:
+    """
+    Session whose connection pool is shared by all download threads
+
+    Connection errors and 429/5xx responses are retried with exponential
+    backoff (backoff, 2*backoff, 4*backoff... seconds), honouring Retry-After.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class PDFDownloader:
+    """
+    Downloads form PDFs into pdf_dir, several at a time
+
+    A sidecar manifest (pdf_dir/manifest.json) records each form's URL,
+    ETag and Last-Modified. Without refresh, files already on disk are used
+    as-is; with refresh, they are revalidated with If-None-Match /
+    If-Modified-Since so only changed PDFs are transferred again.
+    """
+
+    def __init__(
+        self,
+        pdf_dir: str = "data/pdfs",
+        max_workers: int = 8,
+        retries: int = 3,
+        backoff: float = 0.5,
+        timeout: float = 30,
+        session: Optional[requests.Session] = None
+    ):
+        self.pdf_dir = pdf_dir
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.session = session or make_session(self.max_workers, retries, backoff)
+        self.manifest_path = os.path.join(pdf_dir, MANIFEST_FILE)
+        self.manifest = self._load_manifest()
+        self._lock = threading.Lock()
+
+    def _load_manifest(self) -> Dict[str, Dict]:
+        try:
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return manifest if isinstance(manifest, dict) else {}
+
+    def _save_manifest(self):
+        """Write the manifest atomically so an interrupted run never truncates it"""
+        with atomic_write(self.manifest_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+
+    def local_path(self, form_number: str) -> str:
+        return os.path.join(self.pdf_dir, f"{form_number}.pdf")
+
+    def download_all(self, forms: List[Tuple[str, str]], refresh: bool = False) -> Dict[str, Optional[str]]:
+        """
+        Fetch (form_number, url) pairs concurrently
+
+        Args:
+            forms: Form numbers and the URLs of their PDFs
+            refresh: Revalidate files that are already on disk
+
+        Returns:
+            Local path per form number (None if it could not be downloaded
+            and no earlier copy exists)
+        """
+        os.makedirs(self.pdf_dir, exist_ok=True)
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            outcomes = list(pool.map(lambda form: self._fetch(*form, refresh=refresh), forms))
+
+        self._save_manifest()
+
+        counts: Dict[str, int] = {}
+        for _, status in outcomes:
+            counts[status] = counts.get(status, 0) + 1
+        summary = ', '.join(f"{n} {status}" for status, n in sorted(counts.items()))
+        marker = '⚠' if counts.get('failed') or counts.get('stale') else '✓'
+        print(f"  {marker} PDFs ready in {time.perf_counter() - started:.1f}s ({summary})")
+
+        return {form_number: path for (form_number, _), (path, _) in zip(forms, outcomes)}
+
+    def _fetch(self, form_number: str, url: str, refresh: bool) -> Tuple[Optional[str], str]:
+        """Download one PDF; returns (local path or None, status)"""
+        local_path = self.local_path(form_number)
+        exists = os.path.exists(local_path)
+        with self._lock:
+            entry = self.manifest.get(form_number)
+
+        same_url = entry is not None and entry.get('url') == url
+        if exists and not refresh and (entry is None or same_url):
+            return local_path, 'cached'
+
+        headers = {}
+        if exists and same_url:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304:
+                    return local_path, 'not_modified'
+                response.raise_for_status()
+
+                size = 0
+                with atomic_write(local_path) as f:
+                    for block in response.iter_content(chunk_size=64 * 1024):
+                        f.write(block)
+                        size += len(block)
+
+                with self._lock:
+                    self.manifest[form_number] = {
+                        'url': url,
+                        'etag': response.headers.get('ETag'),
+                        'last_modified': response.headers.get('Last-Modified'),
+                        'size': size
+                    }
+
+            print(f"  ✓ Downloaded {form_number}.pdf")
+            return local_path, 'downloaded'
+
+        except Exception as e:
+            print(f"  ✗ Error downloading {form_number}: {e}")
+            # A failed refresh keeps serving the previous copy
+            return (local_path, 'stale') if exists else (None, 'failed')
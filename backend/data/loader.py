@@ -5,12 +5,22 @@ Location: backend/data/loader.py
 
 import json
 import os
-import re
-from pathlib import Path
-from typing import List, Dict
-import requests
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Dict, Optional, Tuple
 import PyPDF2
 
+from data.chunk_cache import ChunkCache, file_digest
+from data.corpus import iter_corpus_records, write_enhanced_corpus
+from data.dedup import dedupe_chunks
+from data.downloader import PDFDownloader
+from data.segmenter import segment_page
+
+# Page range handed to one chunking worker; longer PDFs are split
+PAGES_PER_TASK = 16
+# Bump whenever a change to the extractors changes their output, so cached
+# chunks from the old code are not reused
+EXTRACTOR_VERSION = 1
+
 
 def load_irs_forms(file_path: str = "data/irs_forms_metadata.json") -> List[Dict]:
     """Load raw IRS forms metadata from JSON"""
@@ -25,146 +35,194 @@ def convert_to_bot_format(irs_forms_raw: List[Dict]) -> List[Dict]:
     for form in irs_forms_raw:
         irs_forms.append({
             'filename': f"Form {form['form_number']} - {form['title']}",
-            'content': f"{form['description']} Use cases: {', '.join(form['use_cases'])}. URL: {form['file_url']}"
+            'content': f"{form['description']} Use cases: {', '.join(form['use_cases'])}. URL: {form['file_url']}",
+            'form_number': form['form_number'],
+            'type': 'metadata'
         })
     return irs_forms
 
 
 # NEW ENHANCED FUNCTIONS
 
-def download_pdf(url: str, form_number: str, pdf_dir: str = "data/pdfs") -> str:
-    """Download PDF and return local path"""
-    os.makedirs(pdf_dir, exist_ok=True)
-    local_path = os.path.join(pdf_dir, f"{form_number}.pdf")
-
-    if os.path.exists(local_path):
-        return local_path
-
-    try:
-        print(f"  Downloading Form {form_number}...")
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-
-        with open(local_path, 'wb') as f:
-            f.write(response.content)
-
-        print(f"  ✓ Downloaded {form_number}.pdf")
-        return local_path
-    except Exception as e:
-        print(f"  ✗ Error downloading {form_number}: {e}")
-        return None
+def download_pdf(url: str, form_number: str, pdf_dir: str = "data/pdfs", refresh: bool = False) -> str:
+    """Download PDF (revalidating an existing copy if refresh) and return local path"""
+    downloader = PDFDownloader(pdf_dir, max_workers=1)
+    return downloader.download_all([(form_number, url)], refresh=refresh)[form_number]
 
 
 def extract_line_items(text: str, page_num: int) -> List[Dict]:
     """Extract line items from form text"""
-    chunks = []
-
-    # Pattern for line items like "1  Wages, salaries, tips..."
-    pattern = r'^(\d+[a-z]?)\s+([A-Z].*?)(?=\n\d+[a-z]?\s|\n{2,}|$)'
-    matches = re.finditer(pattern, text, re.MULTILINE)
-
-    for match in matches:
-        line_num = match.group(1)
-        line_text = match.group(2).strip()
-
-        if len(line_text) > 10:
-            chunks.append({
-                "type": "line_item",
-                "line_number": line_num,
-                "text": line_text,
-                "page": page_num
-            })
-
-    return chunks
+    return segment_page(text, page_num)[0]
 
 
 def extract_sections(text: str, page_num: int) -> List[Dict]:
     """Extract section headers"""
-    chunks = []
+    return segment_page(text, page_num)[1]
 
-    # Pattern for section headers: ALL CAPS text
-    pattern = r'^([A-Z][A-Z\s]{9,})$'
-    matches = re.finditer(pattern, text, re.MULTILINE)
 
-    for match in matches:
-        section_text = match.group(1).strip()
+def extract_instructions(text: str, page_num: int) -> List[Dict]:
+    """Extract instruction paragraphs"""
+    return segment_page(text, page_num)[2]
 
-        # Filter out common false positives
-        if section_text not in ['OMB NO', 'DEPARTMENT OF THE TREASURY']:
-            chunks.append({
-                "type": "section_header",
-                "text": section_text,
-                "page": page_num
-            })
 
-    return chunks
+def extract_page_chunks(text: str, page_num: int) -> List[Dict]:
+    """All chunks of one page: line items, then sections, then instructions"""
+    line_items, sections, instructions = segment_page(text, page_num)
+    return line_items + sections + instructions
 
 
-def extract_instructions(text: str, page_num: int) -> List[Dict]:
-    """Extract instruction paragraphs"""
+def chunk_pdf_pages(pdf_path: str, start: int = 0, stop: Optional[int] = None) -> List[Dict]:
+    """
+    Chunk pages [start, stop) of a PDF (0-based range, 1-based page numbers in
+    the chunks); chunk IDs are not assigned here
+    """
     chunks = []
 
-    # Split by double newlines to get paragraphs
-    paragraphs = re.split(r'\n{2,}', text)
+    try:
+        with open(pdf_path, 'rb') as file:
+            reader = PyPDF2.PdfReader(file)
+            stop = len(reader.pages) if stop is None else min(stop, len(reader.pages))
 
-    for para in paragraphs:
-        para = para.strip()
+            for page_idx in range(start, stop):
+                text = reader.pages[page_idx].extract_text()
 
-        # Keep substantial paragraphs
-        if len(para) > 50 and len(para.split()) > 8:
-            # Check if it references a line number
-            line_ref = re.search(r'[Ll]ine\s+(\d+[a-z]?)', para)
+                if not text.strip():
+                    continue
 
-            chunks.append({
-                "type": "instruction",
-                "text": para,
-                "page": page_num,
-                "line_reference": line_ref.group(1) if line_ref else None
-            })
+                chunks.extend(extract_page_chunks(text, page_idx + 1))
+
+    except Exception as e:
+        print(f"    Error processing PDF: {e}")
 
     return chunks
 
 
+def assign_chunk_ids(chunks: List[Dict], form_number: str) -> List[Dict]:
+    """Number chunks in document order: {form_number}_chunk_{idx}"""
+    for idx, chunk in enumerate(chunks):
+        chunk["chunk_id"] = f"{form_number}_chunk_{idx}"
+    return chunks
+
+
 def chunk_pdf(pdf_path: str, form_number: str) -> List[Dict]:
     """Extract and chunk PDF content"""
     if not PyPDF2:
         return []
 
-    all_chunks = []
+    return assign_chunk_ids(chunk_pdf_pages(pdf_path), form_number)
+
 
+def count_pdf_pages(pdf_path: str) -> int:
+    """Number of pages, or 0 if the PDF cannot be read"""
     try:
         with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
+            return len(PyPDF2.PdfReader(file).pages)
+    except Exception as e:
+        print(f"    Error reading {pdf_path}: {e}")
+        return 0
 
-            for page_num, page in enumerate(reader.pages, start=1):
-                text = page.extract_text()
 
-                if not text.strip():
-                    continue
+def _chunk_pages_task(task: Tuple[str, int, int]) -> List[Dict]:
+    """Process-pool entry point (must be module level to be picklable)"""
+    return chunk_pdf_pages(*task)
 
-                # Extract different types of content
-                line_items = extract_line_items(text, page_num)
-                sections = extract_sections(text, page_num)
-                instructions = extract_instructions(text, page_num)
 
-                all_chunks.extend(line_items)
-                all_chunks.extend(sections)
-                all_chunks.extend(instructions)
+def chunk_pdfs_parallel(
+    pdf_jobs: List[Tuple[str, str]],
+    workers: int,
+    pages_per_task: int = PAGES_PER_TASK
+) -> Dict[str, List[Dict]]:
+    """
+    Chunk several PDFs on a process pool
 
-            # Add unique IDs to each chunk
-            for idx, chunk in enumerate(all_chunks):
-                chunk["chunk_id"] = f"{form_number}_chunk_{idx}"
+    Each PDF is split into page ranges of at most pages_per_task pages so a
+    long instruction booklet is spread over several cores. Range results are
+    reassembled in page order before chunk IDs are assigned, so the output
+    is identical to calling chunk_pdf on each PDF in turn.
 
-    except Exception as e:
-        print(f"    Error processing PDF: {e}")
+    Args:
+        pdf_jobs: (form_number, pdf_path) pairs
+        workers: Number of worker processes
+        pages_per_task: Largest page range handed to one worker call
+
+    Returns:
+        Chunks per form number
+    """
+    tasks = []
+    owners = []
+    for form_number, pdf_path in pdf_jobs:
+        n_pages = count_pdf_pages(pdf_path)
+        for start in range(0, n_pages, pages_per_task):
+            tasks.append((pdf_path, start, min(start + pages_per_task, n_pages)))
+            owners.append(form_number)
+
+    chunks_by_form: Dict[str, List[Dict]] = {form_number: [] for form_number, _ in pdf_jobs}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map yields in submission order, i.e. page order within each form
+        for form_number, chunks in zip(owners, pool.map(_chunk_pages_task, tasks)):
+            chunks_by_form[form_number].extend(chunks)
+
+    for form_number, chunks in chunks_by_form.items():
+        assign_chunk_ids(chunks, form_number)
+    return chunks_by_form
+
+
+def chunk_forms(
+    pdf_jobs: List[Tuple[str, str]],
+    workers: int = 1,
+    cache: Optional[ChunkCache] = None
+) -> Dict[str, List[Dict]]:
+    """
+    Chunk (form_number, pdf_path) pairs, reusing cached results
+
+    With a cache, only PDFs whose content hash has no entry for the current
+    EXTRACTOR_VERSION are parsed (on a process pool when workers > 1); the
+    rest are read back from the cache. Chunk IDs are assigned per form
+    either way, so the result does not depend on what was cached.
+    """
+    digests: Dict[str, str] = {}
+    chunks_by_form: Dict[str, List[Dict]] = {}
+    misses = []
 
-    return all_chunks
+    for form_number, pdf_path in pdf_jobs:
+        if cache is not None:
+            digests[form_number] = file_digest(pdf_path)
+            cached = cache.get(digests[form_number])
+            if cached is not None:
+                chunks_by_form[form_number] = assign_chunk_ids(cached, form_number)
+                continue
+        misses.append((form_number, pdf_path))
+
+    print(f"Chunking PDFs: {len(pdf_jobs) - len(misses)} unchanged, {len(misses)} to process"
+          + (f" ({workers} workers)" if workers > 1 and misses else ""))
+
+    if workers > 1 and misses:
+        fresh = chunk_pdfs_parallel(misses, workers)
+    else:
+        fresh = {form_number: chunk_pdf(pdf_path, form_number) for form_number, pdf_path in misses}
+
+    for form_number, chunks in fresh.items():
+        # Empty output usually means the PDF failed to parse; retry next run
+        if cache is not None and chunks:
+            cache.put(digests[form_number], chunks)
+        chunks_by_form[form_number] = chunks
+
+    if cache is not None:
+        cache.prune(keep=set(digests.values()))
+
+    # Input order, whatever mix of cached and fresh results
+    return {form_number: chunks_by_form[form_number] for form_number, _ in pdf_jobs}
 
 
 def load_irs_forms_enhanced(
     file_path: str = "assets/irs_forms_metadata.json",
     download_pdfs: bool = False,
-    pdf_dir: str = "data/pdfs"
+    pdf_dir: str = "data/pdfs",
+    refresh: bool = False,
+    download_workers: int = 8,
+    workers: int = 1,
+    chunk_cache_dir: Optional[str] = None,
+    dedup: bool = True
 ) -> List[Dict]:
     """
     Load IRS forms with optional PDF downloading and chunking
@@ -173,6 +231,13 @@ def load_irs_forms_enhanced(
         file_path: Path to metadata JSON
         download_pdfs: Whether to download and process PDFs
         pdf_dir: Directory to store downloaded PDFs
+        refresh: Re-download PDFs that changed upstream (conditional GET)
+        download_workers: Number of concurrent downloads
+        workers: Processes used for chunking (1 = chunk in this process)
+        chunk_cache_dir: Where per-PDF chunk results are cached
+            (default: <pdf_dir>/chunks, "" disables the cache)
+        dedup: Collapse exact and near-duplicate chunks within each form
+            (see data.dedup); survivors list every page they appeared on
 
     Returns:
         List of enhanced form dictionaries with chunks
@@ -185,24 +250,43 @@ def load_irs_forms_enhanced(
         return forms_raw
 
     print(f"\nProcessing {len(forms_raw)} forms with PDF extraction...")
+    print(f"Downloading PDFs ({download_workers} workers)...")
+    downloader = PDFDownloader(pdf_dir, max_workers=download_workers)
+    pdf_paths = downloader.download_all(
+        [(form['form_number'], form['file_url']) for form in forms_raw],
+        refresh=refresh
+    )
+
+    if chunk_cache_dir is None:
+        chunk_cache_dir = os.path.join(pdf_dir, "chunks")
+    cache = ChunkCache(chunk_cache_dir, EXTRACTOR_VERSION) if chunk_cache_dir else None
+
+    pdf_jobs = [(number, path) for number, path in pdf_paths.items() if path]
+    chunks_by_form = chunk_forms(pdf_jobs, workers, cache)
+
     enhanced_forms = []
 
     for idx, form in enumerate(forms_raw, 1):
         form_number = form['form_number']
         print(f"[{idx}/{len(forms_raw)}] Processing Form {form_number}...")
 
-        # Download PDF
-        pdf_path = download_pdf(form['file_url'], form_number, pdf_dir)
+        pdf_path = pdf_paths[form_number]
 
         if not pdf_path:
             # Keep original form without chunks
             enhanced_forms.append(form)
             continue
 
-        # Extract chunks from PDF
-        chunks = chunk_pdf(pdf_path, form_number)
+        chunks = chunks_by_form[form_number]
         print(f"    Extracted {len(chunks)} chunks")
 
+        dedup_stats = None
+        if dedup:
+            chunks, dedup_stats = dedupe_chunks(chunks)
+            assign_chunk_ids(chunks, form_number)
+            print(f"    Deduplicated to {dedup_stats['chunks_out']} chunks "
+                  f"({dedup_stats['exact_duplicates']} exact, {dedup_stats['near_duplicates']} near duplicates)")
+
         # Create enhanced form entry
         enhanced_form = {
             **form,  # Keep all original fields
@@ -210,18 +294,48 @@ def load_irs_forms_enhanced(
             "chunks": chunks,
             "total_chunks": len(chunks)
         }
+        if dedup_stats is not None:
+            enhanced_form["dedup_stats"] = dedup_stats
 
         enhanced_forms.append(enhanced_form)
         print(f"  ✓ Completed Form {form_number}\n")
 
-    # Save enhanced data
-    output_path = file_path.replace('.json', '_enhanced.json')
-    with open(output_path, 'w') as f:
-        json.dump(enhanced_forms, f, indent=2)
+    return enhanced_forms
 
-    print(f"✓ Enhanced forms saved to: {output_path}")
 
-    return enhanced_forms
+def form_metadata_document(form: Dict) -> Dict:
+    """Bot document describing a form as a whole"""
+    return {
+        'filename': f"Form {form['form_number']} - {form['title']}",
+        'content': f"{form['description']} Use cases: {', '.join(form['use_cases'])}.",
+        'form_number': form['form_number'],
+        'type': 'metadata'
+    }
+
+
+def chunk_document(form_number: str, chunk: Dict) -> Dict:
+    """Bot document for one PDF chunk, labelled with where it came from"""
+    # Add context to chunk content
+    if chunk['type'] == 'line_item' and chunk.get('line_number'):
+        chunk_label = f"Line {chunk['line_number']}"
+    elif chunk['type'] == 'section_header':
+        chunk_label = "Section"
+    elif chunk['type'] == 'instruction':
+        chunk_label = f"Instructions (Page {chunk.get('page', '?')})"
+    else:
+        chunk_label = chunk['type']
+
+    return {
+        'filename': f"Form {form_number} - {chunk_label}",
+        'content': chunk['text'],
+        'form_number': form_number,
+        'type': chunk['type'],
+        'chunk_id': chunk.get('chunk_id'),
+        'page': chunk.get('page'),
+        # Set by dedupe_chunks; chunks from a --no-dedup or older corpus have one page
+        'pages': chunk.get('pages') or ([chunk['page']] if chunk.get('page') is not None else None),
+        'line_number': chunk.get('line_number')
+    }
 
 
 def convert_enhanced_to_bot_format(enhanced_forms: List[Dict]) -> List[Dict]:
@@ -232,68 +346,91 @@ def convert_enhanced_to_bot_format(enhanced_forms: List[Dict]) -> List[Dict]:
     bot_documents = []
 
     for form in enhanced_forms:
-        form_number = form['form_number']
-        form_title = form['title']
-
         # Add the main form metadata as a document
-        bot_documents.append({
-            'filename': f"Form {form_number} - {form_title}",
-            'content': f"{form['description']} Use cases: {', '.join(form['use_cases'])}.",
-            'form_number': form_number,
-            'type': 'metadata'
-        })
+        bot_documents.append(form_metadata_document(form))
 
         # Add each chunk as a separate searchable document
         for chunk in form.get('chunks', []):
-            chunk_content = chunk['text']
-
-            # Add context to chunk content
-            if chunk['type'] == 'line_item' and chunk.get('line_number'):
-                chunk_label = f"Line {chunk['line_number']}"
-            elif chunk['type'] == 'section_header':
-                chunk_label = "Section"
-            elif chunk['type'] == 'instruction':
-                chunk_label = f"Instructions (Page {chunk.get('page', '?')})"
-            else:
-                chunk_label = chunk['type']
-
-            bot_documents.append({
-                'filename': f"Form {form_number} - {chunk_label}",
-                'content': chunk_content,
-                'form_number': form_number,
-                'type': chunk['type'],
-                'chunk_id': chunk.get('chunk_id'),
-                'page': chunk.get('page'),
-                'line_number': chunk.get('line_number')
-            })
+            bot_documents.append(chunk_document(form['form_number'], chunk))
 
     return bot_documents
 
 
+def iter_enhanced_documents(path: str, counts: Optional[Dict[str, int]] = None) -> Iterator[Dict]:
+    """
+    Stream bot documents straight from an enhanced corpus file
+
+    Same documents, in the same order, as convert_enhanced_to_bot_format on
+    the loaded file, but produced one line at a time so a large corpus can
+    be indexed without first materialising every form and chunk.
+
+    Args:
+        path: Enhanced corpus (.jsonl, or a legacy .json array)
+        counts: Optional dict that receives running 'forms' / 'chunks' totals
+    """
+    if counts is None:
+        counts = {}
+    counts.update(forms=0, chunks=0)
+
+    form_number = None
+    for kind, record in iter_corpus_records(path):
+        if kind == 'form':
+            form_number = record['form_number']
+            counts['forms'] += 1
+            yield form_metadata_document(record)
+        else:
+            counts['chunks'] += 1
+            yield chunk_document(form_number, record)
+
+
 # Utility function for one-time processing
 def process_and_save_pdfs(
     input_json: str = "assets/irs_forms_metadata.json",
-    output_json: str = "assets/irs_forms_enhanced.json"
+    output_json: str = "assets/irs_forms_enhanced.jsonl",
+    refresh: bool = False,
+    workers: int = 1,
+    dedup: bool = True
 ):
     """
-    One-time processing to download PDFs and create enhanced JSON
-    Run this once, then use the enhanced JSON for faster loading
+    One-time processing to download PDFs and create the enhanced corpus
+    Run this once, then use the enhanced corpus for faster loading
+
+    The corpus is written once, as compact JSONL, and atomically (see
+    data.corpus.write_enhanced_corpus).
     """
     enhanced_forms = load_irs_forms_enhanced(
         file_path=input_json,
-        download_pdfs=True
+        download_pdfs=True,
+        refresh=refresh,
+        workers=workers,
+        dedup=dedup
     )
 
-    with open(output_json, 'w') as f:
-        json.dump(enhanced_forms, f, indent=2)
+    total_forms, total_chunks = write_enhanced_corpus(output_json, enhanced_forms)
 
     print(f"\n✓ Processing complete! Enhanced data saved to: {output_json}")
-    print(f"  Total forms: {len(enhanced_forms)}")
-    total_chunks = sum(f.get('total_chunks', 0) for f in enhanced_forms)
+    print(f"  Total forms: {total_forms}")
     print(f"  Total chunks: {total_chunks}")
+    removed = sum(
+        f['dedup_stats']['chunks_in'] - f['dedup_stats']['chunks_out']
+        for f in enhanced_forms if 'dedup_stats' in f
+    )
+    if removed:
+        print(f"  Duplicate chunks collapsed: {removed}")
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Download IRS form PDFs and build the enhanced dataset")
+    parser.add_argument('--refresh', action='store_true',
+                        help="Re-download PDFs that changed upstream (uses ETag/Last-Modified)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Processes used to chunk PDFs (default: number of CPUs, 1 = no pool)")
+    parser.add_argument('--no-dedup', action='store_true',
+                        help="Keep repeated headers/boilerplate chunks instead of collapsing them")
+    args = parser.parse_args()
+
     # Run this once to process all PDFs
     print("Starting PDF processing...")
-    process_and_save_pdfs()
\ No newline at end of file
+    process_and_save_pdfs(refresh=args.refresh, workers=args.workers, dedup=not args.no_dedup)
@@ -0,0 +1,185 @@
+"""
+Approximate nearest-neighbour search (IVF-flat) in pure NumPy
+Location: backend/models/ann_index.py
+"""
+
+import hashlib
+import os
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+from models.atomic_file import atomic_write
+from models.vector_store import top_k_indices
+
+
+INDEX_FORMAT_VERSION = 1
+
+# Rows assigned to centroids per block during build
+ASSIGN_BLOCK_ROWS = 65536
+
+
+def corpus_fingerprint(doc_texts: Iterable[str]) -> str:
+    """Hash of every embedded text, used to tell if a saved index still matches"""
+    digest = hashlib.sha256()
+    for text in doc_texts:
+        digest.update(hashlib.sha256(text.encode('utf-8')).digest())
+    return digest.hexdigest()
+
+
+class IVFIndex:
+    """
+    Inverted-file index over an embedding store
+
+    Documents are clustered with spherical k-means into ``n_lists`` lists.
+    A query scores the centroids, visits the ``n_probe`` best lists and does
+    exact scoring only on the rows in those lists. Raising ``n_probe`` trades
+    speed for recall; ``n_probe == n_lists`` is equivalent to brute force.
+    """
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        list_offsets: np.ndarray,
+        list_rows: np.ndarray,
+        n_probe: int = 8,
+        fingerprint: str = ''
+    ):
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_rows = list_rows
+        self.n_probe = n_probe
+        self.fingerprint = fingerprint
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @staticmethod
+    def default_n_lists(n_docs: int) -> int:
+        """Common sqrt(n) heuristic, at least 1"""
+        return max(1, int(np.sqrt(n_docs)))
+
+    @classmethod
+    def build(
+        cls,
+        embeddings: np.ndarray,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        n_iter: int = 15,
+        sample_per_list: int = 256,
+        fingerprint: str = '',
+        seed: int = 0
+    ) -> 'IVFIndex':
+        """
+        Train centroids on a sample and assign every row to its nearest list
+
+        Args:
+            embeddings: float32 (n_docs, dim) matrix
+            n_lists: Number of inverted lists (defaults to sqrt(n_docs))
+            n_probe: Lists visited per query
+            n_iter: k-means iterations
+            sample_per_list: Training sample size per list
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        n_docs = len(embeddings)
+        n_lists = min(n_lists or cls.default_n_lists(n_docs), max(n_docs, 1))
+        rng = np.random.default_rng(seed)
+
+        sample_size = min(n_docs, n_lists * sample_per_list)
+        sample = embeddings[rng.choice(n_docs, size=sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, size=n_lists, replace=False)].copy()
+
+        for _ in range(n_iter):
+            assignment = np.argmax(np.dot(sample, centroids.T), axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=n_lists)
+
+            empty = counts == 0
+            if empty.any():
+                # Re-seed empty lists with random sample points
+                sums[empty] = sample[rng.choice(sample_size, size=int(empty.sum()))]
+            centroids = _normalize(sums)
+
+        assignment = np.empty(n_docs, dtype=np.int64)
+        for start in range(0, n_docs, ASSIGN_BLOCK_ROWS):
+            stop = min(start + ASSIGN_BLOCK_ROWS, n_docs)
+            assignment[start:stop] = np.argmax(np.dot(embeddings[start:stop], centroids.T), axis=1)
+
+        list_rows = np.argsort(assignment, kind='stable')
+        counts = np.bincount(assignment, minlength=n_lists)
+        list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+        return cls(centroids, list_offsets, list_rows, n_probe=n_probe, fingerprint=fingerprint)
+
+    def candidates(self, query: np.ndarray, n_probe: Optional[int] = None) -> np.ndarray:
+        """Row indices stored in the lists closest to the query"""
+        probe = top_k_indices(np.dot(self.centroids, query), n_probe or self.n_probe)
+        return np.concatenate([
+            self.list_rows[self.list_offsets[i]:self.list_offsets[i + 1]] for i in probe
+        ])
+
+    def search(
+        self,
+        store,
+        query: np.ndarray,
+        top_k: int,
+        n_probe: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k for one query
+
+        Args:
+            store: Embedding store (DenseVectors / QuantizedVectors) the index was built on
+            query: (dim,) query vector
+
+        Returns:
+            (row indices, similarities), best first
+        """
+        rows = np.sort(self.candidates(query, n_probe))
+        similarities = store.scores(query, rows)
+        top = top_k_indices(similarities, top_k)
+        return rows[top], similarities[top]
+
+    def save(self, path: str):
+        """Atomically write the index next to the other index files"""
+        with atomic_write(path) as f:
+            np.savez(
+                f,
+                version=np.array(INDEX_FORMAT_VERSION),
+                fingerprint=np.array(self.fingerprint),
+                centroids=self.centroids,
+                list_offsets=self.list_offsets,
+                list_rows=self.list_rows
+            )
+
+    @classmethod
+    def load(cls, path: str, n_probe: int = 8) -> Optional['IVFIndex']:
+        """Load a saved index, or None if it is missing or unreadable"""
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data['version']) != INDEX_FORMAT_VERSION:
+                    return None
+                index = cls(
+                    data['centroids'],
+                    data['list_offsets'],
+                    data['list_rows'],
+                    n_probe=n_probe,
+                    fingerprint=str(data['fingerprint'])
+                )
+        except Exception as e:
+            print(f"⚠ Discarding ANN index {path}: {e}")
+            return None
+
+        if index.list_offsets[-1] != len(index.list_rows):
+            return None
+        return index
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1.0)
@@ -0,0 +1,34 @@
+"""
+Atomic file replacement through unique temporary files
+Location: backend/models/atomic_file.py
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Iterator, Optional
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = 'wb', encoding: Optional[str] = None) -> Iterator[IO]:
+    """
+    Open a temporary file next to path; it replaces path when the block exits cleanly
+
+    The temporary name is unique (tempfile.mkstemp in the same directory),
+    so several processes writing the same path never share a temp file: each
+    one's os.replace succeeds and readers only ever see a complete file. On
+    error the temporary file is removed and path is left untouched.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,243 @@
+"""
+Columnar document table that can be memory-mapped from disk
+Location: backend/models/document_store.py
+"""
+
+import json
+import os
+from array import array
+from typing import Dict, Iterable, Iterator, List, Sequence
+
+import numpy as np
+
+
+STORE_FORMAT_VERSION = 3
+
+# Free-text fields: all of them share one UTF-8 buffer, laid out row by row
+TEXT_FIELDS = ('filename', 'content', 'line_number', 'chunk_id')
+# Low-cardinality fields: int32 codes into a vocabulary (-1 = missing)
+CATEGORY_FIELDS = ('form_number', 'type')
+# Integer fields: int32 (-1 = missing)
+INT_FIELDS = ('page',)
+# Integer list fields: int32 values with one offsets array (empty = missing)
+LIST_FIELDS = ('pages',)
+
+FIELDS = TEXT_FIELDS + CATEGORY_FIELDS + INT_FIELDS + LIST_FIELDS
+# Fields every loader sets; the others are left out of a document dict when missing
+REQUIRED_FIELDS = ('filename', 'content')
+
+_TEXT_POSITION = {field: i for i, field in enumerate(TEXT_FIELDS)}
+
+
+class DocumentStore:
+    """
+    Read-only sequence of documents stored column-wise
+
+    Text fields live in one concatenated buffer: document i, text field j
+    spans ``text_data[text_offsets[i*F + j]:text_offsets[i*F + j + 1]]``
+    with F = len(TEXT_FIELDS), so one document's text is a single slice.
+    Indexing returns a dict with the loaders' field names (optional fields
+    that are missing are left out), so code that does
+    ``documents[i]['filename']`` or ``doc.get('page')`` works unchanged.
+    Saved stores are a directory of .npy files plus meta.json; loading
+    memory-maps the arrays, so processes opening the same store share the
+    pages and nothing is parsed per row.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], vocab: Dict[str, List[str]], size: int):
+        self._columns = columns
+        self._vocab = vocab
+        self._size = size
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Dict]) -> 'DocumentStore':
+        """
+        Pack document dicts into columns
+
+        documents may be any iterable (e.g. a generator streaming a corpus
+        file); it is consumed in one pass and no dict is kept afterwards.
+        Text is appended straight to the shared UTF-8 buffer, so no per-field
+        bytes objects accumulate either.
+        """
+        text_data = bytearray()
+        text_lengths = array('q')
+        missing = bytearray()
+        codes_by_value: Dict[str, Dict[str, int]] = {field: {} for field in CATEGORY_FIELDS}
+        # Compact typed accumulators rather than lists of Python ints
+        codes = {field: array('i') for field in CATEGORY_FIELDS}
+        ints = {field: array('i') for field in INT_FIELDS}
+        list_values = {field: array('i') for field in LIST_FIELDS}
+        list_lengths = {field: array('q') for field in LIST_FIELDS}
+
+        size = 0
+        for doc in documents:
+            size += 1
+            for field in TEXT_FIELDS:
+                value = doc.get(field)
+                missing.append(value is None)
+                if value is None:
+                    text_lengths.append(0)
+                else:
+                    encoded = str(value).encode('utf-8')
+                    text_data += encoded
+                    text_lengths.append(len(encoded))
+
+            for field in CATEGORY_FIELDS:
+                value = doc.get(field)
+                field_codes = codes_by_value[field]
+                codes[field].append(-1 if value is None else field_codes.setdefault(value, len(field_codes)))
+
+            for field in INT_FIELDS:
+                value = doc.get(field)
+                ints[field].append(-1 if value is None else int(value))
+
+            for field in LIST_FIELDS:
+                values = doc.get(field) or ()
+                list_values[field].extend(int(value) for value in values)
+                list_lengths[field].append(len(values))
+
+        columns: Dict[str, np.ndarray] = {}
+        lengths = np.frombuffer(text_lengths, dtype=np.int64)
+        columns['text_offsets'] = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        # Shares text_data's memory instead of copying it
+        columns['text_data'] = np.frombuffer(text_data, dtype=np.uint8)
+        columns['text_missing'] = np.frombuffer(bytes(missing), dtype=np.bool_).reshape(size, len(TEXT_FIELDS))
+
+        for field in CATEGORY_FIELDS:
+            columns[f'{field}_codes'] = np.frombuffer(codes[field], dtype=np.intc).astype(np.int32)
+        for field in INT_FIELDS:
+            columns[field] = np.frombuffer(ints[field], dtype=np.intc).astype(np.int32)
+        for field in LIST_FIELDS:
+            lengths = np.frombuffer(list_lengths[field], dtype=np.int64)
+            columns[f'{field}_offsets'] = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+            columns[f'{field}_values'] = np.frombuffer(list_values[field], dtype=np.intc).astype(np.int32)
+
+        vocab = {field: list(codes_by_value[field]) for field in CATEGORY_FIELDS}
+        return cls(columns, vocab, size)
+
+    def save(self, path: str):
+        """Write the store as a directory of .npy files"""
+        os.makedirs(path, exist_ok=True)
+        for name, column in self._columns.items():
+            np.save(os.path.join(path, f'{name}.npy'), column)
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({
+                'version': STORE_FORMAT_VERSION,
+                'size': self._size,
+                'vocab': self._vocab,
+                'columns': list(self._columns)
+            }, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'DocumentStore':
+        """Open a saved store (memory-mapped unless mmap=False)"""
+        with open(os.path.join(path, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        if meta.get('version') != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported document store version in {path}")
+
+        mmap_mode = 'r' if mmap else None
+        columns = {
+            name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode)
+            for name in meta['columns']
+        }
+        return cls(columns, meta['vocab'], meta['size'])
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, idx: int) -> Dict:
+        if idx < 0:
+            idx += self._size
+        if not 0 <= idx < self._size:
+            raise IndexError(idx)
+        record = self.record(idx)
+        return {
+            field: value for field, value in record.items()
+            if value is not None or field in REQUIRED_FIELDS
+        }
+
+    def __iter__(self) -> Iterator[Dict]:
+        for idx in range(self._size):
+            yield self[idx]
+
+    def record(self, idx: int, fields: Sequence[str] = FIELDS) -> Dict:
+        """
+        Selected fields of one document (missing ones as None)
+
+        The document's text fields are read with one slice of the shared
+        buffer rather than one lookup per field.
+        """
+        n_text = len(TEXT_FIELDS)
+        offsets = self._columns['text_offsets'][idx * n_text:(idx + 1) * n_text + 1]
+        base = int(offsets[0])
+        raw = self._columns['text_data'][base:int(offsets[-1])].tobytes()
+        missing = self._columns['text_missing'][idx]
+
+        record = {}
+        for field in fields:
+            j = _TEXT_POSITION.get(field)
+            if j is None:
+                record[field] = self.value(idx, field)
+            elif missing[j]:
+                record[field] = None
+            else:
+                record[field] = raw[int(offsets[j]) - base:int(offsets[j + 1]) - base].decode('utf-8')
+        return record
+
+    def value(self, idx: int, field: str):
+        """Single field of one document without building the whole dict"""
+        j = _TEXT_POSITION.get(field)
+        if j is not None:
+            if self._columns['text_missing'][idx, j]:
+                return None
+            pos = idx * len(TEXT_FIELDS) + j
+            offsets = self._columns['text_offsets']
+            return self._columns['text_data'][offsets[pos]:offsets[pos + 1]].tobytes().decode('utf-8')
+
+        if field in CATEGORY_FIELDS:
+            code = int(self._columns[f'{field}_codes'][idx])
+            return self._vocab[field][code] if code >= 0 else None
+
+        if field in INT_FIELDS:
+            value = int(self._columns[field][idx])
+            return value if value >= 0 else None
+
+        if field in LIST_FIELDS:
+            offsets = self._columns[f'{field}_offsets']
+            values = self._columns[f'{field}_values'][int(offsets[idx]):int(offsets[idx + 1])]
+            return [int(value) for value in values] if len(values) else None
+
+        raise KeyError(field)
+
+    def codes(self, field: str) -> np.ndarray:
+        """int32 category codes of a field (-1 = missing)"""
+        return self._columns[f'{field}_codes']
+
+    def vocabulary(self, field: str) -> List[str]:
+        """Values that the codes of a category field index into"""
+        return self._vocab[field]
+
+    def rows_by_value(self, field: str) -> Dict[str, np.ndarray]:
+        """Sorted row indices for every value of a category field"""
+        codes = np.asarray(self.codes(field))
+        order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes[codes >= 0], minlength=len(self._vocab[field]))
+        start = int(np.searchsorted(codes[order], 0))
+
+        rows = {}
+        for code, value in enumerate(self._vocab[field]):
+            rows[value] = order[start:start + counts[code]].astype(np.int64)
+            start += counts[code]
+        return rows
+
+    def code_of(self, field: str, value: str) -> int:
+        """Code of a category value, or -1 if it never occurs"""
+        try:
+            return self._vocab[field].index(value)
+        except ValueError:
+            return -1
+
+    def nbytes(self) -> int:
+        """Total size of the column arrays"""
+        return sum(column.nbytes for column in self._columns.values())
@@ -0,0 +1,135 @@
+"""
+Persistent on-disk cache of document embeddings
+Location: backend/models/embedding_cache.py
+"""
+
+import hashlib
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+from models.atomic_file import atomic_write
+
+
+CACHE_FORMAT_VERSION = 1
+# Keys are sha256 hex digests, stored as fixed-width ASCII
+KEY_DTYPE = 'S64'
+
+
+def document_key(text: str) -> str:
+    """Stable content hash for an embedding text (filename + content)"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Maps document content hashes to embedding vectors for one model.
+
+    The cache lives in a single .npz file per embedding model. In memory it
+    is one array of keys and one contiguous float32 matrix (plus a sorted
+    view of the keys for lookups), not an object per entry. Anything that
+    fails to load or does not match the expected model/format is discarded
+    and rebuilt on the next save.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str):
+        self.cache_dir = cache_dir
+        self.model_name = model_name
+        slug = model_name.replace('/', '_')
+        self.path = os.path.join(cache_dir, f"embeddings_{slug}.npz")
+        self.clear()
+
+    def load(self) -> int:
+        """Load cached vectors from disk. Returns number of entries loaded."""
+        self.clear()
+
+        if not os.path.exists(self.path):
+            return 0
+
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                version = int(data['version'])
+                model = str(data['model'])
+                keys = data['keys']
+                vectors = data['vectors']
+
+            if version != CACHE_FORMAT_VERSION:
+                raise ValueError(f"format version {version} != {CACHE_FORMAT_VERSION}")
+            if model != self.model_name:
+                raise ValueError(f"model '{model}' != '{self.model_name}'")
+            if vectors.ndim != 2 or len(keys) != len(vectors):
+                raise ValueError("keys/vectors shape mismatch")
+            if not np.all(np.isfinite(vectors)):
+                raise ValueError("non-finite values in cached vectors")
+
+        except Exception as e:
+            print(f"⚠ Discarding embedding cache {self.path}: {e}")
+            return 0
+
+        self._set(keys, vectors)
+        return len(self)
+
+    def _set(self, keys: np.ndarray, vectors: np.ndarray):
+        self._keys = np.asarray(keys).astype(KEY_DTYPE, copy=False)
+        self._vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.dim = self._vectors.shape[1]
+        self._order = np.argsort(self._keys, kind='stable')
+        self._sorted_keys = self._keys[self._order]
+
+    def lookup(self, keys: np.ndarray) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """
+        Cached vectors for an array of keys
+
+        Returns:
+            (matrix, found) where matrix is an (n_keys, dim) float32 array
+            holding the cached vector of every found key (zeros elsewhere),
+            or None when the cache is empty, and found is a boolean mask
+        """
+        keys = np.asarray(keys).astype(KEY_DTYPE, copy=False)
+        found = np.zeros(len(keys), dtype=bool)
+        if len(self) == 0:
+            return None, found
+
+        positions = np.minimum(np.searchsorted(self._sorted_keys, keys), len(self._sorted_keys) - 1)
+        found = self._sorted_keys[positions] == keys
+        matrix = np.zeros((len(keys), self.dim), dtype=np.float32)
+        matrix[found] = self._vectors[self._order[positions[found]]]
+        return matrix, found
+
+    def replace(self, keys: np.ndarray, vectors: np.ndarray):
+        """
+        Make the cache hold exactly these entries
+
+        Called with the current corpus, so vectors of documents that are no
+        longer in it are dropped instead of accumulating across runs. The
+        vectors array is referenced, not copied.
+        """
+        if len(keys) != len(vectors):
+            raise ValueError("keys/vectors length mismatch")
+        self._set(keys, vectors)
+
+    def clear(self):
+        """Drop all cached vectors"""
+        self._keys = np.empty(0, dtype=KEY_DTYPE)
+        self._vectors: Optional[np.ndarray] = None
+        self._order = np.empty(0, dtype=np.int64)
+        self._sorted_keys = self._keys
+        self.dim: Optional[int] = None
+
+    def save(self):
+        """Atomically write the cache to disk"""
+        if len(self) == 0:
+            return
+
+        with atomic_write(self.path) as f:
+            np.savez(
+                f,
+                version=np.array(CACHE_FORMAT_VERSION),
+                model=np.array(self.model_name),
+                keys=self._keys,
+                vectors=self._vectors
+            )
+
+    def __len__(self):
+        return len(self._keys)
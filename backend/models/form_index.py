@@ -0,0 +1,90 @@
+"""
+Per-form summary index for the /api/forms endpoints
+Location: backend/models/form_index.py
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from models.document_store import DocumentStore
+
+
+PREVIEW_SIZE = 5
+
+
+class FormIndex:
+    """
+    Built once per corpus so form listings and form details are answered
+    without scanning every document.
+
+    For each form it keeps the document count, per-type chunk counts, the
+    metadata document and a preview of the first chunks. Everything is
+    computed from the store's category codes, so only the documents that
+    end up in a preview are decoded. Previewed documents carry every store
+    field, with None for the ones a document does not have.
+    """
+
+    def __init__(self, documents: DocumentStore, preview_size: int = PREVIEW_SIZE):
+        self.total_documents = len(documents)
+        self._forms: Dict[str, Dict] = {}
+
+        type_codes = np.asarray(documents.codes('type'))
+        type_vocab = documents.vocabulary('type')
+        metadata_code = documents.code_of('type', 'metadata')
+
+        # rows_by_value keeps vocabulary order, i.e. order of first appearance
+        for form_number, rows in documents.rows_by_value('form_number').items():
+            if not form_number or len(rows) == 0:
+                continue
+
+            types = type_codes[rows]
+            counts = np.bincount(types[types >= 0], minlength=len(type_vocab))
+            is_metadata = (types == metadata_code) & (metadata_code >= 0)
+            metadata_rows = rows[is_metadata]
+            preview_rows = rows[~is_metadata][:preview_size]
+
+            self._forms[form_number] = {
+                'filename': documents.value(int(rows[0]), 'filename'),
+                'total': len(rows),
+                'type_counts': {type_vocab[code]: int(n) for code, n in enumerate(counts) if n},
+                'metadata': documents.record(int(metadata_rows[0])) if len(metadata_rows) else None,
+                'preview': [documents.record(int(idx)) for idx in preview_rows]
+            }
+
+        self._listing = [
+            {"form_number": form_number, "filename": entry['filename']}
+            for form_number, entry in self._forms.items()
+        ]
+
+    def list_forms(self) -> List[Dict]:
+        """Unique forms in corpus order with the filename of their first document"""
+        return self._listing
+
+    def details(self, form_number: str) -> Optional[Dict]:
+        """Summary of one form in the /api/forms/{form_number} shape, or None"""
+        entry = self._forms.get(form_number)
+        if entry is None:
+            return None
+
+        counts = entry['type_counts']
+        chunk_total = entry['total'] - counts.get('metadata', 0)
+
+        return {
+            "form_number": form_number,
+            "total_documents": entry['total'],
+            "has_chunks": chunk_total > 0,
+            "metadata": entry['metadata'],
+            "chunks": {
+                "total": chunk_total,
+                "by_type": {
+                    "line_items": counts.get('line_item', 0),
+                    "sections": counts.get('section_header', 0),
+                    "instructions": counts.get('instruction', 0)
+                },
+                "preview": entry['preview']
+            }
+        }
+
+    def __len__(self):
+        return len(self._forms)
@@ -0,0 +1,225 @@
+"""
+Lexical retrieval: BM25 inverted index and exact form / line lookups
+Location: backend/models/lexical_index.py
+"""
+
+import json
+import os
+import re
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from models.document_store import DocumentStore
+
+
+# Keeps hyphenated identifiers like "w-9", "1099-nec" and "k-1" as one token
+_TOKEN = re.compile(r'[a-z0-9]+(?:-[a-z0-9]+)*')
+_NON_ALNUM = re.compile(r'[^a-z0-9]')
+_LINE_QUERY = re.compile(r'^(.*?)\s*\bline\s+(\d+[a-z]?)\s*$')
+_FORM_PREFIX = re.compile(r'^(?:irs\s+)?(?:form\s+)?')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; hyphenated tokens also emit their joined form ("w-9" -> "w9")"""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        tokens.append(token)
+        if '-' in token:
+            tokens.append(token.replace('-', ''))
+    return tokens
+
+
+def form_key(text: str) -> str:
+    """Canonical lookup key for a form identifier ("W-9" -> "w9")"""
+    return _NON_ALNUM.sub('', text.lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed list of texts
+
+    Postings are kept as flat arrays (all doc ids and term frequencies,
+    sliced per term by offsets) so an index can be saved and memory-mapped.
+    """
+
+    def __init__(
+        self,
+        terms: List[str],
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        freqs: np.ndarray,
+        idf: np.ndarray,
+        length_norm: np.ndarray,
+        k1: float = 1.2
+    ):
+        self.k1 = k1
+        self.n_docs = len(length_norm)
+        self._term_index = {term: i for i, term in enumerate(terms)}
+        self._offsets = offsets
+        self._doc_ids = doc_ids
+        self._freqs = freqs
+        self._idf = idf
+        # Length normalisation term k1 * (1 - b + b * dl / avgdl), precomputed per doc
+        self._length_norm = length_norm
+
+    @classmethod
+    def build(cls, texts: Iterable[str], k1: float = 1.2, b: float = 0.75) -> 'BM25Index':
+        """
+        Tokenize texts and build the posting arrays
+
+        texts may be any iterable and is consumed in one pass. Postings are
+        collected as flat (term id, doc id, frequency) typed arrays and
+        grouped by term with one stable sort, so only the vocabulary is held
+        in Python objects.
+        """
+        term_ids: Dict[str, int] = {}
+        posting_terms = array('i')
+        posting_docs = array('i')
+        posting_freqs = array('i')
+        doc_lengths = array('i')
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            for token, count in Counter(tokens).items():
+                posting_terms.append(term_ids.setdefault(token, len(term_ids)))
+                posting_docs.append(doc_id)
+                posting_freqs.append(count)
+
+        n_docs = len(doc_lengths)
+        lengths = np.frombuffer(doc_lengths, dtype=np.intc).astype(np.float32)
+        avg_length = float(lengths.mean()) if n_docs else 0.0
+        length_norm = (k1 * (1 - b + b * lengths / (avg_length or 1.0))).astype(np.float32)
+
+        terms = list(term_ids)
+        term_column = np.frombuffer(posting_terms, dtype=np.intc)
+        # Stable, so each term's doc ids stay in ascending order
+        order = np.argsort(term_column, kind='stable')
+        df = np.bincount(term_column, minlength=len(terms)).astype(np.int64)
+        offsets = np.concatenate([[0], np.cumsum(df)]).astype(np.int64)
+        doc_ids = np.frombuffer(posting_docs, dtype=np.intc)[order].astype(np.int32)
+        freqs = np.frombuffer(posting_freqs, dtype=np.intc)[order].astype(np.float32)
+        idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        return cls(terms, offsets, doc_ids, freqs, idf, length_norm, k1=k1)
+
+    def save(self, path: str):
+        """Write the posting arrays and vocabulary to a directory"""
+        os.makedirs(path, exist_ok=True)
+        for name in ('offsets', 'doc_ids', 'freqs', 'idf', 'length_norm'):
+            np.save(os.path.join(path, f'{name}.npy'), getattr(self, f'_{name}'))
+        with open(os.path.join(path, 'terms.json'), 'w') as f:
+            json.dump({'k1': self.k1, 'terms': list(self._term_index)}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'BM25Index':
+        """Open a saved index (posting arrays memory-mapped unless mmap=False)"""
+        with open(os.path.join(path, 'terms.json'), 'r') as f:
+            meta = json.load(f)
+        mmap_mode = 'r' if mmap else None
+        arrays = {
+            name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode)
+            for name in ('offsets', 'doc_ids', 'freqs', 'idf', 'length_norm')
+        }
+        return cls(meta['terms'], k1=meta['k1'], **arrays)
+
+    def scores(self, query: str) -> np.ndarray:
+        """
+        BM25 scores of every document, scaled to [0, 1]
+
+        Scores are divided by the best score any document could get for this
+        query, so a match on rare terms counts for more than one on common ones.
+        """
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        best_possible = 0.0
+
+        for term in set(tokenize(query)):
+            i = self._term_index.get(term)
+            if i is None:
+                continue
+            start, stop = self._offsets[i], self._offsets[i + 1]
+            doc_ids = self._doc_ids[start:stop]
+            freqs = self._freqs[start:stop]
+            idf = float(self._idf[i])
+            scores[doc_ids] += idf * freqs * (self.k1 + 1) / (freqs + self._length_norm[doc_ids])
+            best_possible += idf * (self.k1 + 1)
+
+        if best_possible > 0:
+            scores /= best_possible
+        return scores
+
+
+class ExactLookup:
+    """
+    Dictionary lookups for queries that are just a form number ("941", "W-9")
+    or a form plus a line ("Schedule K-1 line 14")
+    """
+
+    def __init__(self, documents: DocumentStore):
+        self._form_rows: Dict[str, List[int]] = {}
+        self._line_rows: Dict[Tuple[str, str], List[int]] = {}
+
+        alias_forms: Dict[str, set] = {}
+        for form_number, rows in documents.rows_by_value('form_number').items():
+            if not form_number or len(rows) == 0:
+                continue
+            self._form_rows[form_number] = rows.tolist()
+            for alias in self._aliases(form_number):
+                alias_forms.setdefault(alias, set()).add(form_number)
+
+        # Only line items need their line number decoded
+        form_codes = documents.codes('form_number')
+        form_vocab = documents.vocabulary('form_number')
+        line_item_code = documents.code_of('type', 'line_item')
+        line_item_rows = np.flatnonzero(np.asarray(documents.codes('type')) == line_item_code)
+        for idx in (line_item_rows.tolist() if line_item_code >= 0 else []):
+            code = int(form_codes[idx])
+            line_number = documents.value(idx, 'line_number')
+            if code < 0 or not form_vocab[code] or not line_number:
+                continue
+            key = (form_vocab[code], line_number.lower())
+            self._line_rows.setdefault(key, []).append(idx)
+
+        # Drop aliases that could mean more than one form
+        self._aliases_to_form = {
+            alias: next(iter(forms)) for alias, forms in alias_forms.items() if len(forms) == 1
+        }
+
+    @staticmethod
+    def _aliases(form_number: str) -> List[str]:
+        """'Schedule K-1 (Form 1065)' -> ['schedulek1form1065', 'schedulek1', 'k1']"""
+        aliases = [form_key(form_number)]
+        base = re.sub(r'\s*\(.*?\)', '', form_number).strip()
+        aliases.append(form_key(base))
+        if base.lower().startswith('schedule '):
+            aliases.append(form_key(base[len('schedule '):]))
+        return [a for a in dict.fromkeys(aliases) if a]
+
+    def resolve(self, query: str) -> Optional[Tuple[str, Optional[str]]]:
+        """Return (form_number, line_number or None) if the query is an exact lookup"""
+        text = query.strip().lower().rstrip('?.!')
+        line_number = None
+
+        line_match = _LINE_QUERY.match(text)
+        if line_match:
+            text, line_number = line_match.group(1), line_match.group(2)
+
+        text = _FORM_PREFIX.sub('', text.strip())
+        form_number = self._aliases_to_form.get(form_key(text))
+        if form_number is None:
+            return None
+        return form_number, line_number
+
+    def rows(self, form_number: str, line_number: Optional[str] = None) -> List[int]:
+        """
+        Document rows answering the lookup, best first
+
+        Form lookups return the form's metadata document followed by its
+        chunks; line lookups return the matching line items, or [] if the
+        form has no such line.
+        """
+        if line_number is not None:
+            return list(self._line_rows.get((form_number, line_number), []))
+        return list(self._form_rows.get(form_number, []))
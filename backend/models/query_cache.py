@@ -0,0 +1,110 @@
+"""
+Bounded caches used on the query path
+Location: backend/models/query_cache.py
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_query(text: str) -> str:
+    """Case-fold, strip punctuation and collapse whitespace"""
+    text = _PUNCTUATION.sub(' ', text.casefold())
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache with hit/miss counters"""
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value (marking it recently used) or None"""
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value or None, without touching recency or counters"""
+        with self._lock:
+            return self._data.get(key)
+
+    def put(self, key: Hashable, value: Any):
+        """Insert a value, evicting the least recently used entry when full"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TTLCache(LRUCache):
+    """LRU cache whose entries also expire ttl seconds after insertion"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0):
+        super().__init__(max_size)
+        self.ttl = ttl
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = super().get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            with self._lock:
+                self._data.pop(key, None)
+                # Counted as a hit by LRUCache.get - it was really a miss
+                self.hits -= 1
+                self.misses += 1
+            return None
+        return value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        entry = super().peek(key)
+        if entry is None or time.monotonic() >= entry[0]:
+            return None
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        super().put(key, (time.monotonic() + self.ttl, value))
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats['ttl_seconds'] = self.ttl
+        return stats
@@ -3,64 +3,466 @@ Enhanced RAG Accountant Bot with PDF chunk support
 Location: backend/models/rag_bot.py
 """
 
-from sentence_transformers import SentenceTransformer
 import numpy as np
-from typing import List, Dict, Optional
+import os
+import uuid
+from typing import Iterable, Iterator, List, Dict, Optional, Sequence, Union, TYPE_CHECKING
+
+from models.ann_index import IVFIndex, corpus_fingerprint
+from models.document_store import DocumentStore
+from models.embedding_cache import KEY_DTYPE, EmbeddingCache, document_key
+from models.form_index import FormIndex
+from models.lexical_index import BM25Index, ExactLookup
+from models.query_cache import LRUCache, normalize_query
+from models.vector_store import build_vector_store, recall_at_k, top_k_indices
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+DEFAULT_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# Document fields copied into every search result
+RESULT_FIELDS = ('filename', 'content', 'form_number', 'type', 'page', 'pages', 'line_number')
+
+# Embedding texts materialized at a time while indexing
+ENCODE_BLOCK_SIZE = 4096
+
+
+def load_embedder(model_name: str = DEFAULT_MODEL_NAME, warmup: bool = True) -> "SentenceTransformer":
+    """
+    Load the embedding model, optionally running one dummy encode
+
+    sentence_transformers (and torch behind it) is imported here rather than
+    at module level because that import dominates process start time.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    print("Loading embedding model...")
+    embedder = SentenceTransformer(model_name)
+    if warmup:
+        embedder.encode(["warmup"])
+    return embedder
 
 
 class RAGAccountantBot:
-    def __init__(self, use_chunks: bool = False):
+    def __init__(
+        self,
+        use_chunks: bool = False,
+        model_name: str = DEFAULT_MODEL_NAME,
+        cache_dir: Optional[str] = None,
+        storage: str = 'float32',
+        storage_dir: Optional[str] = None,
+        ann_index: Optional[str] = None,
+        ann_min_docs: int = 20000,
+        ann_n_lists: Optional[int] = None,
+        ann_n_probe: int = 8,
+        query_cache_size: int = 1024,
+        hybrid_weight: float = 0.3,
+        exact_lookup: bool = True,
+        embedder: Optional["SentenceTransformer"] = None
+    ):
         """
         Initialize the RAG bot
 
         Args:
             use_chunks: If True, expects documents with PDF chunks.
                        If False, uses simple metadata format (backwards compatible)
+            model_name: SentenceTransformer model used for embeddings
+            cache_dir: Directory for the persistent embedding cache (None disables it)
+            storage: Embedding matrix storage - 'float32' (in memory), or
+                     'float16' / 'int8' (quantized, memory-mapped from storage_dir)
+            storage_dir: Directory for the memory-mapped matrix and ANN index
+                         (defaults to cache_dir)
+            ann_index: 'ivf' to build an approximate index for large corpora,
+                       None for brute-force search
+            ann_min_docs: Corpora smaller than this always use brute force
+            ann_n_lists: IVF list count (defaults to sqrt(n_docs))
+            ann_n_probe: IVF lists visited per query (higher = better recall, slower)
+            query_cache_size: Max cached query embeddings (0 disables the cache)
+            hybrid_weight: Weight of the normalized BM25 score added to the dense
+                           similarity (0 disables lexical scoring)
+            exact_lookup: Answer bare form-number / "form line N" queries from a
+                          dictionary without running the embedder
+            embedder: Already-loaded model to reuse (e.g. when rebuilding the index)
         """
-        print("Loading embedding model...")
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
-        self.documents = []
+        self.model_name = model_name
+        self.embedder = embedder if embedder is not None else load_embedder(model_name)
+        self.documents = DocumentStore.from_documents([])
         self.doc_embeddings = None
+        self.index_version = None
         self.use_chunks = use_chunks
+        self.embedding_cache = EmbeddingCache(cache_dir, model_name) if cache_dir else None
+        self.storage = storage
+        self.storage_dir = storage_dir or cache_dir
+        self.ann_index_type = ann_index
+        self.ann_min_docs = ann_min_docs
+        self.ann_n_lists = ann_n_lists
+        self.ann_n_probe = ann_n_probe
+        self.ann_index: Optional[IVFIndex] = None
+        self.query_cache = LRUCache(query_cache_size)
+        self.hybrid_weight = hybrid_weight
+        self.use_exact_lookup = exact_lookup
+        self.lexical_index: Optional[BM25Index] = None
+        self.exact_lookup: Optional[ExactLookup] = None
+        self.form_index = FormIndex(self.documents)
+        self._form_rows: Dict[str, np.ndarray] = {}
+        self._type_rows: Dict[str, np.ndarray] = {}
         print("Bot ready!")
 
-    def add_documents(self, documents: List[Dict[str, str]]):
-        """Add documents and create embeddings"""
+    def add_documents(self, documents: Union[Iterable[Dict[str, str]], DocumentStore]):
+        """
+        Add documents and create embeddings (reusing cached vectors when available)
+
+        Document dicts are packed into a columnar DocumentStore, so the bot
+        does not keep one Python dict per chunk alive. Any iterable works,
+        e.g. a generator streaming documents from the corpus file. Embedding
+        texts are then read back from the store as they are needed (at most
+        ENCODE_BLOCK_SIZE at a time), never as a list for the whole corpus.
+        """
+        if not isinstance(documents, DocumentStore):
+            documents = DocumentStore.from_documents(documents)
         self.documents = documents
         print(f"Creating embeddings for {len(documents)} documents...")
 
-        # Create text for embedding - works for both simple and chunked formats
-        doc_texts = []
-        for doc in documents:
-            # Combine filename and content for better context
-            text = f"{doc['filename']} {doc['content']}"
-            doc_texts.append(text)
+        if self.embedding_cache is None:
+            embeddings = self._encode_rows(np.arange(len(documents)))
+        else:
+            embeddings = self._encode_with_cache()
+
+        self.doc_embeddings = build_vector_store(embeddings, self.storage, self.storage_dir)
+        if self.storage != 'float32':
+            self._report_quantization_recall(embeddings)
+        self._build_ann_index(embeddings)
+        self.lexical_index = BM25Index.build(self._doc_texts()) if self.hybrid_weight > 0 else None
+        self.build_derived_indexes()
 
-        self.doc_embeddings = self.embedder.encode(doc_texts)
+        # New id on every (re)index so anything cached against the old corpus is stale
+        self.index_version = uuid.uuid4().hex
         print("Documents indexed!")
 
-    def find_relevant_files(self, query: str, top_k: int = 3) -> List[Dict]:
-        """Find most relevant documents using semantic search"""
-        if self.doc_embeddings is None:
+    def _doc_texts(self, rows: Optional[Iterable[int]] = None) -> Iterator[str]:
+        """
+        Embedding text of each document (all of them unless rows is given)
+
+        Filename and content are combined for better context; works for both
+        simple and chunked formats. Texts are read from the store one by one.
+        """
+        for idx in (range(len(self.documents)) if rows is None else rows):
+            doc = self.documents.record(int(idx), ('filename', 'content'))
+            yield f"{doc['filename']} {doc['content']}"
+
+    def _encode_rows(self, rows: Sequence[int]) -> np.ndarray:
+        """Encode the given documents in blocks of ENCODE_BLOCK_SIZE into one float32 matrix"""
+        if len(rows) == 0:
+            return np.asarray(self.embedder.encode([]), dtype=np.float32)
+
+        embeddings = None
+        for start in range(0, len(rows), ENCODE_BLOCK_SIZE):
+            block = rows[start:start + ENCODE_BLOCK_SIZE]
+            vectors = np.asarray(self.embedder.encode(list(self._doc_texts(block))), dtype=np.float32)
+            if embeddings is None:
+                embeddings = np.empty((len(rows), vectors.shape[1]), dtype=np.float32)
+            embeddings[start:start + len(block)] = vectors
+        return embeddings
+
+    def _build_ann_index(self, embeddings: np.ndarray):
+        """Load or build the IVF index when enabled and the corpus is large enough"""
+        self.ann_index = None
+        if self.ann_index_type is None or len(embeddings) < self.ann_min_docs:
+            return
+        if self.ann_index_type != 'ivf':
+            raise ValueError(f"Unknown ANN index type '{self.ann_index_type}'. Use 'ivf' or None")
+
+        fingerprint = corpus_fingerprint(self._doc_texts())
+        path = os.path.join(self.storage_dir, 'ann_ivf.npz') if self.storage_dir else None
+
+        if path:
+            index = IVFIndex.load(path, n_probe=self.ann_n_probe)
+            n_lists = self.ann_n_lists or IVFIndex.default_n_lists(len(embeddings))
+            if index is not None and index.fingerprint == fingerprint and index.n_lists == n_lists:
+                print(f"  Loaded IVF index ({index.n_lists} lists, n_probe={index.n_probe})")
+                self.ann_index = index
+                return
+
+        print("  Building IVF index...")
+        self.ann_index = IVFIndex.build(
+            embeddings,
+            n_lists=self.ann_n_lists,
+            n_probe=self.ann_n_probe,
+            fingerprint=fingerprint
+        )
+        print(f"  ✓ IVF index built ({self.ann_index.n_lists} lists, n_probe={self.ann_n_probe})")
+
+        if path:
+            try:
+                self.ann_index.save(path)
+            except OSError as e:
+                print(f"  ⚠ Could not save ANN index: {e}")
+
+    def build_derived_indexes(self):
+        """Rebuild the cheap lookup structures that are derived from self.documents"""
+        self._build_filter_rows()
+        self.form_index = FormIndex(self.documents)
+        self.exact_lookup = ExactLookup(self.documents) if self.use_exact_lookup else None
+
+    def _build_filter_rows(self):
+        """Precompute sorted row indices per form_number and per document type"""
+        self._form_rows = self.documents.rows_by_value('form_number')
+        self._type_rows = self.documents.rows_by_value('type')
+
+    def _filter_rows(self, form_number: Optional[str] = None, doc_type: Optional[str] = None) -> Optional[np.ndarray]:
+        """
+        Rows allowed by the metadata filters
+
+        Returns None when no filter is set (score everything), otherwise a
+        sorted (possibly empty) array of document indices.
+        """
+        rows = None
+        if form_number is not None:
+            rows = self._form_rows.get(form_number, np.empty(0, dtype=np.int64))
+        if doc_type is not None:
+            type_rows = self._type_rows.get(doc_type, np.empty(0, dtype=np.int64))
+            rows = type_rows if rows is None else np.intersect1d(rows, type_rows, assume_unique=True)
+        return rows
+
+    def _report_quantization_recall(self, embeddings: np.ndarray, sample_size: int = 64, k: int = 10):
+        """Compare quantized top-k against float32 using a sample of documents as queries"""
+        if len(embeddings) == 0:
+            return
+        rng = np.random.default_rng(0)
+        sample = rng.choice(len(embeddings), size=min(sample_size, len(embeddings)), replace=False)
+        recall = recall_at_k(embeddings, self.doc_embeddings, embeddings[sample], k=k)
+        print(f"  {self.storage} storage recall@{k} vs float32: {recall:.3f}")
+
+    def _encode_with_cache(self) -> np.ndarray:
+        """
+        Encode only the documents missing from the embedding cache
+
+        The cache is rewritten to hold exactly the current corpus and then
+        released, so it does not stay resident next to the index.
+        """
+        cache = self.embedding_cache
+        n_docs = len(self.documents)
+        try:
+            loaded = cache.load()
+
+            keys = np.empty(n_docs, dtype=KEY_DTYPE)
+            for i, text in enumerate(self._doc_texts()):
+                keys[i] = document_key(text)
+            embeddings, found = cache.lookup(keys)
+            missing = np.flatnonzero(~found)
+            print(f"  Embedding cache: {n_docs - len(missing)} hits, "
+                  f"{len(missing)} to encode ({loaded} cached entries)")
+
+            if len(missing):
+                new_vectors = self._encode_rows(missing)
+                if embeddings is not None and new_vectors.shape[1] != embeddings.shape[1]:
+                    # Cached vectors have a different dimension - rebuild everything
+                    print("  ⚠ Cached embedding dimension mismatch, re-encoding all documents")
+                    missing = np.arange(n_docs)
+                    new_vectors = self._encode_rows(missing)
+                    embeddings = None
+                if embeddings is None:
+                    embeddings = np.zeros((n_docs, new_vectors.shape[1]), dtype=np.float32)
+                embeddings[missing] = new_vectors
+
+            if embeddings is None:
+                return np.zeros((0, cache.dim or 0), dtype=np.float32)
+
+            # Rewrite when something was encoded or entries of removed documents would remain
+            if len(missing) or loaded != len(keys):
+                cache.replace(keys, embeddings)
+                try:
+                    cache.save()
+                except OSError as e:
+                    print(f"  ⚠ Could not save embedding cache: {e}")
+
+            return embeddings
+        finally:
+            cache.clear()
+
+    def find_relevant_files(
+        self,
+        query: str,
+        top_k: int = 3,
+        form_number: Optional[str] = None,
+        doc_type: Optional[str] = None,
+        query_embedding: Optional[np.ndarray] = None,
+        exact_matches: Optional[List[Dict]] = None
+    ) -> List[Dict]:
+        """
+        Find most relevant documents using semantic search
+
+        Args:
+            query: Natural language question
+            top_k: Number of results to return
+            form_number: Only score documents belonging to this form
+            doc_type: Only score documents of this type (e.g. 'line_item')
+            query_embedding: Precomputed embedding of query. Skips encoding and
+                the exact-match check, which the caller has already done
+            exact_matches: Result of exact_match() already run by the caller
+        """
+        if self.doc_embeddings is None or top_k <= 0:
+            return []
+
+        if exact_matches is not None:
+            return exact_matches
+        if query_embedding is None:
+            exact = self.exact_match(query, top_k, form_number, doc_type)
+            if exact is not None:
+                return exact
+
+        rows = self._filter_rows(form_number, doc_type)
+        if rows is not None and len(rows) == 0:
             return []
 
-        query_embedding = self.embedder.encode(query)
-        similarities = np.dot(self.doc_embeddings, query_embedding)
-        top_indices = np.argsort(similarities)[::-1][:top_k]
+        if query_embedding is None:
+            query_embeddings = self.encode_queries([query])
+        else:
+            query_embeddings = np.asarray(query_embedding, dtype=np.float32)[None, :]
+        return self._search(query_embeddings, top_k, rows, [query])[0]
+
+    def exact_match(
+        self,
+        query: str,
+        top_k: int,
+        form_number: Optional[str] = None,
+        doc_type: Optional[str] = None
+    ) -> Optional[List[Dict]]:
+        """
+        Fast path for queries that only name a form ("941", "W-9") or a form
+        line ("Schedule K-1 line 14")
+
+        Returns the matching documents with similarity 1.0, or None when the
+        query is not an exact lookup (or nothing matches the filters) and
+        should go through normal search.
+        """
+        if self.exact_lookup is None or top_k <= 0:
+            return None
+
+        resolved = self.exact_lookup.resolve(query)
+        if resolved is None:
+            return None
 
-        results = []
-        for idx in top_indices:
-            results.append({
-                'filename': self.documents[idx]['filename'],
-                'content': self.documents[idx]['content'],
-                'similarity': float(similarities[idx]),
-                'form_number': self.documents[idx].get('form_number'),
-                'type': self.documents[idx].get('type'),
-                'page': self.documents[idx].get('page'),
-                'line_number': self.documents[idx].get('line_number')
-            })
+        matched_form, line_number = resolved
+        if form_number is not None and form_number != matched_form:
+            return None
 
-        return results
+        rows = self.exact_lookup.rows(matched_form, line_number)
+        if doc_type is not None:
+            allowed = self._type_rows.get(doc_type, np.empty(0, dtype=np.int64))
+            rows = [idx for idx, keep in zip(rows, np.isin(rows, allowed)) if keep]
+        if not rows:
+            return None
+
+        return [self._result(idx, 1.0) for idx in rows[:top_k]]
+
+    def encode_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Embed queries, serving repeats from the LRU cache
+
+        Cache keys are normalized text (case-folded, punctuation stripped,
+        whitespace collapsed); misses are encoded together in one model call.
+
+        Returns:
+            float32 (n_queries, dim) matrix
+        """
+        keys = [normalize_query(q) for q in queries]
+        vectors = [self.query_cache.get(key) for key in keys]
+
+        missing: Dict[str, int] = {}
+        for i, vec in enumerate(vectors):
+            if vec is None and keys[i] not in missing:
+                missing[keys[i]] = i
+
+        if missing:
+            encoded = np.asarray(
+                self.embedder.encode([queries[i] for i in missing.values()]),
+                dtype=np.float32
+            )
+            fresh = dict(zip(missing.keys(), encoded))
+            for key, vec in fresh.items():
+                self.query_cache.put(key, vec)
+            vectors = [fresh[key] if vec is None else vec for key, vec in zip(keys, vectors)]
+
+        return np.stack(vectors)
+
+    def _search(
+        self,
+        query_embeddings: np.ndarray,
+        top_k: int,
+        rows: Optional[np.ndarray],
+        queries: List[str]
+    ) -> List[List[Dict]]:
+        """
+        Rank documents for a (n_queries, dim) batch of query embeddings
+
+        Unfiltered queries go through the ANN index when one is built; everything
+        else is one matrix-matrix product with row-wise partial selection.
+        With hybrid scoring on, documents are ranked by the dense similarity
+        plus hybrid_weight * BM25; results report that as "score" and keep the
+        dense cosine as "similarity".
+        """
+        if rows is None and self.ann_index is not None:
+            return [
+                self._search_ann(query_embedding, top_k, query)
+                for query_embedding, query in zip(query_embeddings, queries)
+            ]
+
+        similarities = self.doc_embeddings.scores(query_embeddings, rows)
+        scores = similarities
+        if self.lexical_index is not None:
+            scores = similarities.copy()
+            for i, query in enumerate(queries):
+                lexical = self.lexical_index.scores(query)
+                scores[i] += self.hybrid_weight * (lexical if rows is None else lexical[rows])
+
+        top_positions = top_k_indices(scores, top_k)
+        top_indices = top_positions if rows is None else rows[top_positions]
+        top_similarities = np.take_along_axis(similarities, top_positions, axis=-1)
+        top_scores = np.take_along_axis(scores, top_positions, axis=-1)
+
+        return [
+            [
+                self._result(idx, similarity, score)
+                for idx, similarity, score in zip(row_indices, row_similarities, row_scores)
+            ]
+            for row_indices, row_similarities, row_scores in zip(top_indices, top_similarities, top_scores)
+        ]
+
+    def _search_ann(self, query_embedding: np.ndarray, top_k: int, query: str) -> List[Dict]:
+        """ANN search, fused with the best BM25 candidates when hybrid scoring is on"""
+        if self.lexical_index is None:
+            top_indices, top_scores = self.ann_index.search(self.doc_embeddings, query_embedding, top_k)
+            return [self._result(idx, score) for idx, score in zip(top_indices, top_scores)]
+
+        # Re-rank the union of dense and lexical candidates with the fused score
+        n_candidates = top_k * 4
+        dense_rows, _ = self.ann_index.search(self.doc_embeddings, query_embedding, n_candidates)
+        lexical = self.lexical_index.scores(query)
+        lexical_rows = top_k_indices(lexical, n_candidates)
+        lexical_rows = lexical_rows[lexical[lexical_rows] > 0]
+
+        candidates = np.union1d(dense_rows, lexical_rows)
+        similarities = self.doc_embeddings.scores(query_embedding, candidates)
+        fused = similarities + self.hybrid_weight * lexical[candidates]
+        top = top_k_indices(fused, top_k)
+        return [
+            self._result(idx, similarity, score)
+            for idx, similarity, score in zip(candidates[top], similarities[top], fused[top])
+        ]
+
+    def _result(self, idx: int, similarity: float, score: Optional[float] = None) -> Dict:
+        """
+        Build a result dict for document idx straight from the store columns
+
+        similarity is the dense cosine; score is what the result was ranked
+        by (the same value unless hybrid scoring added BM25 to it).
+        """
+        result = self.documents.record(int(idx), RESULT_FIELDS)
+        result['similarity'] = float(similarity)
+        result['score'] = float(similarity if score is None else score)
+        return result
 
     def _parse_form_info(self, form_doc: Dict) -> Dict:
         """Extract form details from document"""
@@ -196,26 +598,92 @@ class RAGAccountantBot:
 
         return opener + explanation + related_info + closing
 
-    def query(self, user_query: str, use_generation: bool = True) -> Dict:
+    def query(
+        self,
+        user_query: str,
+        use_generation: bool = True,
+        top_k: int = 5,
+        form_number: Optional[str] = None,
+        doc_type: Optional[str] = None,
+        query_embedding: Optional[np.ndarray] = None,
+        exact_matches: Optional[List[Dict]] = None
+    ) -> Dict:
         """
         Main query interface
 
         Args:
             user_query: Natural language question
             use_generation: Whether to generate friendly response
+            top_k: Number of relevant files to return
+            form_number: Restrict search to one form
+            doc_type: Restrict search to one document type
+            query_embedding: Precomputed embedding of user_query, if already encoded
+            exact_matches: Exact-match fast path result, if already resolved
 
         Returns:
             Dictionary with answer and relevant files
         """
-        relevant_docs = self.find_relevant_files(user_query, top_k=5)
+        relevant_docs = self.find_relevant_files(
+            user_query,
+            top_k=top_k,
+            form_number=form_number,
+            doc_type=doc_type,
+            query_embedding=query_embedding,
+            exact_matches=exact_matches
+        )
+        return self._build_response(user_query, relevant_docs, use_generation)
+
+    def query_batch(
+        self,
+        user_queries: List[str],
+        use_generation: bool = True,
+        top_k: int = 5,
+        form_number: Optional[str] = None,
+        doc_type: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Answer many questions with one batched encode and one matrix product
 
-        if use_generation and relevant_docs:
-            answer = self.generate_answer(user_query, relevant_docs)
+        Args:
+            user_queries: Natural language questions
+            (other arguments as in query, applied to every question)
+
+        Returns:
+            One query() style dictionary per question, in input order
+        """
+        if not user_queries:
+            return []
+
+        rows = self._filter_rows(form_number, doc_type)
+        if self.doc_embeddings is None or top_k <= 0 or (rows is not None and len(rows) == 0):
+            batch_docs = [[] for _ in user_queries]
         else:
-            files = [doc['filename'] for doc in relevant_docs]
-            answer = f"Found {len(files)} relevant forms: {', '.join(files)}"
+            batch_docs = [self.exact_match(q, top_k, form_number, doc_type) for q in user_queries]
+
+            # Only queries without an exact answer go to the model
+            pending = [i for i, docs in enumerate(batch_docs) if docs is None]
+            if pending:
+                pending_queries = [user_queries[i] for i in pending]
+                query_embeddings = self.encode_queries(pending_queries)
+                searched = self._search(query_embeddings, top_k, rows, pending_queries)
+                for i, docs in zip(pending, searched):
+                    batch_docs[i] = docs
+
+        return [
+            self._build_response(user_query, relevant_docs, use_generation)
+            for user_query, relevant_docs in zip(user_queries, batch_docs)
+        ]
+
+    def build_answer(self, user_query: str, relevant_docs: List[Dict], use_generation: bool = True) -> str:
+        """Templated answer for already-retrieved documents (or a plain list of them)"""
+        if use_generation and relevant_docs:
+            return self.generate_answer(user_query, relevant_docs)
+        files = [doc['filename'] for doc in relevant_docs]
+        return f"Found {len(files)} relevant forms: {', '.join(files)}"
 
+    def _build_response(self, user_query: str, relevant_docs: List[Dict], use_generation: bool) -> Dict:
+        """Attach the templated (or plain list) answer to retrieved documents"""
         return {
-            'answer': answer,
+            'answer': self.build_answer(user_query, relevant_docs, use_generation),
             'relevant_files': relevant_docs
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,187 @@
+"""
+Build-once, attach-many index shared between server worker processes
+Location: backend/models/shared_index.py
+"""
+
+import json
+import os
+import shutil
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from models.ann_index import IVFIndex
+from models.atomic_file import atomic_write
+from models.document_store import DocumentStore
+from models.lexical_index import BM25Index
+from models.vector_store import DenseVectors, QuantizedVectors
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, workers may build concurrently
+    fcntl = None
+
+
+SHARED_FORMAT_VERSION = 3
+POINTER_FILE = 'current.json'
+
+
+@contextmanager
+def _build_lock(shared_dir: str):
+    """Exclusive lock so only one worker builds while the others wait"""
+    os.makedirs(shared_dir, exist_ok=True)
+    with open(os.path.join(shared_dir, 'build.lock'), 'w') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def read_pointer(shared_dir: str) -> Optional[Dict]:
+    """Manifest of the currently published index, or None"""
+    try:
+        with open(os.path.join(shared_dir, POINTER_FILE), 'r') as f:
+            pointer = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if pointer.get('version') != SHARED_FORMAT_VERSION:
+        return None
+    if not os.path.isdir(os.path.join(shared_dir, pointer.get('dir', ''))):
+        return None
+    return pointer
+
+
+def export_index(bot, path: str) -> Dict:
+    """
+    Write an indexed bot's matrix, document table, BM25 and IVF arrays to path
+
+    Returns the manifest describing what was written.
+    """
+    os.makedirs(path, exist_ok=True)
+
+    store = bot.doc_embeddings
+    if isinstance(store, QuantizedVectors):
+        matrix_file = os.path.basename(store.path)
+        shutil.copyfile(store.path, os.path.join(path, matrix_file))
+        if store.scales is not None:
+            scales_file = matrix_file[:-len('.npy')] + '_scales.npy'
+            np.save(os.path.join(path, scales_file), np.asarray(store.scales))
+    else:
+        matrix_file = 'doc_embeddings_float32.npy'
+        np.save(os.path.join(path, matrix_file), store.matrix)
+
+    documents = bot.documents
+    if not isinstance(documents, DocumentStore):
+        documents = DocumentStore.from_documents(documents)
+    documents.save(os.path.join(path, 'documents'))
+
+    if bot.lexical_index is not None:
+        bot.lexical_index.save(os.path.join(path, 'bm25'))
+
+    if bot.ann_index is not None:
+        ann_dir = os.path.join(path, 'ann')
+        os.makedirs(ann_dir, exist_ok=True)
+        for name in ('centroids', 'list_offsets', 'list_rows'):
+            np.save(os.path.join(ann_dir, f'{name}.npy'), getattr(bot.ann_index, name))
+
+    manifest = {
+        'model': bot.model_name,
+        'storage': store.storage,
+        'matrix_file': matrix_file,
+        'use_chunks': bot.use_chunks,
+        'has_bm25': bot.lexical_index is not None,
+        'has_ann': bot.ann_index is not None
+    }
+    with open(os.path.join(path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def attach_index(bot, path: str, index_id: str):
+    """Point bot at a published index, memory-mapping every large array read-only"""
+    with open(os.path.join(path, 'manifest.json'), 'r') as f:
+        manifest = json.load(f)
+
+    if manifest['model'] != bot.model_name:
+        raise ValueError(f"Shared index was built with '{manifest['model']}', bot uses '{bot.model_name}'")
+
+    matrix_path = os.path.join(path, manifest['matrix_file'])
+    if manifest['storage'] == 'float32':
+        bot.doc_embeddings = DenseVectors(np.load(matrix_path, mmap_mode='r'))
+    else:
+        bot.doc_embeddings = QuantizedVectors(matrix_path)
+
+    bot.documents = DocumentStore.load(os.path.join(path, 'documents'))
+
+    bot.lexical_index = None
+    if manifest['has_bm25'] and bot.hybrid_weight > 0:
+        bot.lexical_index = BM25Index.load(os.path.join(path, 'bm25'))
+
+    bot.ann_index = None
+    if manifest['has_ann']:
+        ann_dir = os.path.join(path, 'ann')
+        arrays = {
+            name: np.load(os.path.join(ann_dir, f'{name}.npy'), mmap_mode='r')
+            for name in ('centroids', 'list_offsets', 'list_rows')
+        }
+        bot.ann_index = IVFIndex(n_probe=bot.ann_n_probe, **arrays)
+
+    bot.build_derived_indexes()
+    bot.index_version = index_id
+
+
+def build_or_attach(bot, shared_dir: str, source_key: str, build: Callable[[], object]):
+    """
+    Attach bot to the shared index for source_key, building it first if needed
+
+    The first worker to take the lock runs build() (which must return an
+    indexed bot), exports it to a fresh directory and publishes it by
+    atomically replacing current.json; the built copy is then dropped.
+    Every worker, the builder included, finally attaches to the published
+    files so the matrix and tables exist once in the page cache.
+    """
+    with _build_lock(shared_dir):
+        pointer = read_pointer(shared_dir)
+
+        if pointer is None or pointer.get('source_key') != source_key:
+            print(f"Building shared index in {shared_dir}...")
+            built = build()
+
+            index_id = uuid.uuid4().hex
+            index_dir = f'index-{index_id}'
+            export_index(built, os.path.join(shared_dir, index_dir))
+            del built
+
+            new_pointer = {
+                'version': SHARED_FORMAT_VERSION,
+                'index_id': index_id,
+                'dir': index_dir,
+                'source_key': source_key
+            }
+            with atomic_write(os.path.join(shared_dir, POINTER_FILE), 'w') as f:
+                json.dump(new_pointer, f)
+
+            _remove_stale(shared_dir, keep={index_dir, pointer['dir'] if pointer else None})
+            pointer = new_pointer
+            print(f"✓ Published shared index {index_id}")
+
+    attach_index(bot, os.path.join(shared_dir, pointer['dir']), pointer['index_id'])
+    print(f"✓ Attached to shared index {pointer['index_id']} ({len(bot.documents)} documents)")
+    return bot
+
+
+def _remove_stale(shared_dir: str, keep: set):
+    """
+    Delete older index directories
+
+    The previous one is kept so workers still attached to it are not
+    surprised; on POSIX their open mappings would survive deletion anyway.
+    """
+    for name in os.listdir(shared_dir):
+        if name.startswith('index-') and name not in keep:
+            shutil.rmtree(os.path.join(shared_dir, name), ignore_errors=True)
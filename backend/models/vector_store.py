@@ -0,0 +1,253 @@
+"""
+Embedding matrix storage backends (in-memory float32 or quantized memory-mapped)
+Location: backend/models/vector_store.py
+"""
+
+import hashlib
+import os
+from typing import Optional
+
+import numpy as np
+
+from models.atomic_file import atomic_write
+
+
+STORAGE_MODES = ('float32', 'float16', 'int8')
+
+# Rows scored per block when reading a memory-mapped matrix. Keeps the
+# float32 temporaries bounded instead of upcasting the whole file at once.
+SCORE_BLOCK_ROWS = 65536
+
+
+class DenseVectors:
+    """Plain float32 matrix held in process memory"""
+
+    storage = 'float32'
+
+    def __init__(self, embeddings: np.ndarray):
+        self.matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    def scores(self, queries: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Dot product of queries against stored rows
+
+        Args:
+            queries: (dim,) vector or (n_queries, dim) matrix
+            rows: Optional row indices to restrict scoring to
+
+        Returns:
+            (n_rows,) for a single query, (n_queries, n_rows) for a batch
+        """
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        return np.dot(queries, matrix.T)
+
+    def vectors(self, rows: np.ndarray) -> np.ndarray:
+        """Return float32 copies of the given rows"""
+        return self.matrix[rows]
+
+
+class QuantizedVectors:
+    """
+    float16 or int8 matrix in a memory-mapped .npy file
+
+    int8 rows are stored with a per-row float32 scale (max |x| / 127) so a
+    score is ``(q . row_int8) * scale``. The OS page cache backs the file,
+    so several processes opening the same path share one copy.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.matrix = np.load(path, mmap_mode='r')
+        self.storage = 'int8' if self.matrix.dtype == np.int8 else 'float16'
+
+        self.scales = None
+        if self.storage == 'int8':
+            self.scales = np.load(_scales_path(path), mmap_mode='r')
+            if len(self.scales) != len(self.matrix):
+                raise ValueError(f"Scale vector does not match matrix rows in {path}")
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, path: str, storage: str) -> 'QuantizedVectors':
+        """Quantize a float32 matrix, write it atomically to path and open it"""
+        if storage not in ('float16', 'int8'):
+            raise ValueError(f"Unsupported quantized storage: {storage}")
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+
+        if storage == 'float16':
+            _atomic_save(path, embeddings.astype(np.float16))
+        else:
+            max_abs = np.abs(embeddings).max(axis=1) if len(embeddings) else np.zeros(0)
+            scales = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+            quantized = np.rint(embeddings / scales[:, None]).clip(-127, 127).astype(np.int8)
+            _atomic_save(_scales_path(path), scales)
+            _atomic_save(path, quantized)
+
+        return cls(path)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    def scores(self, queries: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Dot product of queries against stored rows (see DenseVectors.scores)"""
+        queries = np.asarray(queries, dtype=np.float32)
+
+        if rows is not None:
+            return np.dot(queries, self.vectors(rows).T)
+
+        n_rows = len(self)
+        out_shape = (n_rows,) if queries.ndim == 1 else (queries.shape[0], n_rows)
+        out = np.empty(out_shape, dtype=np.float32)
+
+        for start in range(0, n_rows, SCORE_BLOCK_ROWS):
+            stop = min(start + SCORE_BLOCK_ROWS, n_rows)
+            block = np.asarray(self.matrix[start:stop], dtype=np.float32)
+            block_scores = np.dot(queries, block.T)
+            if self.scales is not None:
+                block_scores *= self.scales[start:stop]
+            out[..., start:stop] = block_scores
+
+        return out
+
+    def vectors(self, rows: np.ndarray) -> np.ndarray:
+        """Return dequantized float32 copies of the given rows"""
+        block = np.asarray(self.matrix[rows], dtype=np.float32)
+        if self.scales is not None:
+            block *= np.asarray(self.scales[rows])[..., None]
+        return block
+
+
+def build_vector_store(embeddings: np.ndarray, storage: str = 'float32', storage_dir: Optional[str] = None):
+    """
+    Create the embedding store for the requested storage mode
+
+    Args:
+        embeddings: float32 (n_docs, dim) matrix
+        storage: 'float32' (in memory), 'float16' or 'int8' (memory-mapped)
+        storage_dir: Directory for the memory-mapped file (required unless float32)
+    """
+    if storage not in STORAGE_MODES:
+        raise ValueError(f"Unknown storage mode '{storage}'. Use one of {STORAGE_MODES}")
+
+    if storage == 'float32':
+        return DenseVectors(embeddings)
+
+    if not storage_dir:
+        raise ValueError(f"storage_dir is required for '{storage}' storage")
+
+    # Named by content: a rebuild with other data never rewrites a file that a
+    # live bot (e.g. the one being replaced by a hot reload) has memory-mapped,
+    # and workers building the same corpus end up sharing one file
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    path = os.path.join(storage_dir, f"doc_embeddings_{storage}_{embedding_digest(embeddings)}.npy")
+
+    store = _open_existing(path, embeddings.shape)
+    if store is None:
+        try:
+            store = QuantizedVectors.build(embeddings, path, storage)
+        except OSError:
+            # Another process published the same file first (Windows refuses
+            # to replace a file that is mapped)
+            store = _open_existing(path, embeddings.shape)
+            if store is None:
+                raise
+
+    _remove_stale_matrices(storage_dir, storage, keep=path)
+    return store
+
+
+def embedding_digest(embeddings: np.ndarray) -> str:
+    """Short content hash of a float32 embedding matrix"""
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(repr(embeddings.shape).encode('ascii'))
+    digest.update(memoryview(np.ascontiguousarray(embeddings, dtype=np.float32)).cast('B'))
+    return digest.hexdigest()
+
+
+def _open_existing(path: str, shape: tuple) -> Optional[QuantizedVectors]:
+    """Open a previously written matrix file if it is complete and matches shape"""
+    if not os.path.exists(path):
+        return None
+    try:
+        store = QuantizedVectors(path)
+    except (OSError, ValueError):
+        return None
+    return store if store.matrix.shape == shape else None
+
+
+def _remove_stale_matrices(storage_dir: str, storage: str, keep: str):
+    """
+    Delete matrix files of earlier corpora
+
+    On POSIX a bot that still maps one keeps its data after the unlink; where
+    a mapped file cannot be deleted (Windows) it is left for a later build.
+    """
+    prefix = f"doc_embeddings_{storage}"
+    keep_names = {os.path.basename(keep), os.path.basename(_scales_path(keep))}
+    for name in os.listdir(storage_dir):
+        if name.startswith(prefix) and name.endswith('.npy') and name not in keep_names:
+            try:
+                os.remove(os.path.join(storage_dir, name))
+            except OSError:
+                pass
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores in descending order, using partial selection
+
+    Works on a 1-D score vector or row-wise on a 2-D (n_queries, n_rows) matrix.
+    """
+    n = scores.shape[-1]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        candidates = np.broadcast_to(np.arange(n), scores.shape).copy()
+
+    candidate_scores = np.take_along_axis(scores, candidates, axis=-1)
+    order = np.argsort(-candidate_scores, axis=-1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=-1)
+
+
+def recall_at_k(reference: np.ndarray, store, queries: np.ndarray, k: int = 10) -> float:
+    """
+    Fraction of the exact float32 top-k that the store also ranks in its top-k
+
+    Args:
+        reference: float32 (n_docs, dim) matrix used as ground truth
+        store: DenseVectors or QuantizedVectors built from the same matrix
+        queries: (n_queries, dim) query vectors
+    """
+    k = min(k, len(reference))
+    if k == 0 or len(queries) == 0:
+        return 1.0
+
+    exact = top_k_indices(np.dot(queries, reference.T), k)
+    approx = top_k_indices(store.scores(queries), k)
+
+    hits = sum(len(np.intersect1d(e, a)) for e, a in zip(exact, approx))
+    return hits / float(k * len(queries))
+
+
+def _scales_path(path: str) -> str:
+    return path[:-len('.npy')] + '_scales.npy' if path.endswith('.npy') else path + '_scales.npy'
+
+
+def _atomic_save(path: str, array: np.ndarray):
+    with atomic_write(path) as f:
+        np.save(f, array)
@@ -0,0 +1,42 @@
+"""
+Tests for near-duplicate chunk collapse
+Location: backend/tests/test_dedup.py
+"""
+
+from data.dedup import dedupe_chunks
+
+
+INSTRUCTION = ("If the corporation's total receipts are more than {amount}, "
+               "complete Schedule L and attach it to the return. {footer}")
+
+
+def _instruction(page: int, amount: str, footer: str = '') -> dict:
+    return {
+        'type': 'instruction',
+        'line_reference': None,
+        'page': page,
+        'text': INSTRUCTION.format(amount=amount, footer=footer),
+    }
+
+
+def test_chunks_differing_only_in_an_amount_are_kept():
+    chunks = [_instruction(1, '$25,000'), _instruction(2, '$75,000')]
+
+    kept, stats = dedupe_chunks(chunks)
+
+    assert [chunk['text'] for chunk in kept] == [chunk['text'] for chunk in chunks]
+    assert [chunk['pages'] for chunk in kept] == [[1], [2]]
+    assert stats['near_duplicates'] == 0
+
+
+def test_page_numbers_and_revision_dates_do_not_make_chunks_unique():
+    chunks = [
+        _instruction(1, '$25,000', 'Form 1120 (Rev. December 2022) Page 1'),
+        _instruction(4, '$25,000', 'Form 1120 (Rev. December 2023) Page 4'),
+    ]
+
+    kept, stats = dedupe_chunks(chunks)
+
+    assert len(kept) == 1
+    assert kept[0]['pages'] == [1, 4]
+    assert stats['near_duplicates'] == 1
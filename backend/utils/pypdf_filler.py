@@ -1,12 +1,15 @@
 """
 IRS Form 1120 PDF Filler using PyPDF
-Install: pip install pypdf pandas openpyxl
+Install: pip install pypdf openpyxl
+Run from backend/: python -m utils.pypdf_filler [--rows FILE] [--workers N]
 """
 
 from pypdf import PdfReader, PdfWriter
-import pandas as pd
+import argparse
 import os
 
+from utils.pdf_fill_engine import fill_rows, iter_rows
+
 # Configuration
 TEMPLATE_PDF = "data/f1120.pdf"
 EXCEL_FILE = "data/1120_pdf_filing_examples.xlsx"
@@ -83,76 +86,66 @@ def fill_pdf_simple_test():
     print("Open this PDF and check if you see 'TEST COMPANY NAME' anywhere!")
 
 
-def fill_from_excel():
-    """Fill PDFs from Excel file"""
+# Field mapping - Using the FULL field paths from the IRS PDF
+# Based on the output above, the text fields start with topmostSubform[0].Page1[0]...
+FIELD_MAPPING = {
+    "CompanyName": "topmostSubform[0].Page1[0].TypeOrPrintBox[0].f1_4[0]",  # Name field
+    "EIN": "topmostSubform[0].Page1[0].PgHeader[0].f1_2[0]",  # EIN at top
+    "TaxYear": "topmostSubform[0].Page1[0].PgHeader[0].f1_1[0]",  # Tax year
+    "AddressLine1": "topmostSubform[0].Page1[0].TypeOrPrintBox[0].f1_5[0]",  # Address
+    "City": "topmostSubform[0].Page1[0].TypeOrPrintBox[0].f1_6[0]",  # City/State/ZIP line
+    "State": "topmostSubform[0].Page1[0].f1_7[0]",
+    "Zip": "topmostSubform[0].Page1[0].f1_8[0]",
+    "TotalIncome": "topmostSubform[0].Page1[0].f1_10[0]",
+    "TotalDeductions": "topmostSubform[0].Page1[0].f1_29[0]",
+    "TaxableIncome": "topmostSubform[0].Page1[0].f1_30[0]",
+    "Tax": "topmostSubform[0].Page1[0].f1_31[0]",
+}
+
+
+def fill_from_excel(rows_file: str = EXCEL_FILE, workers: int = 1):
+    """
+    Fill one PDF per row of an Excel or CSV file
+
+    The template is parsed once (once per worker process) and cloned for
+    each row; rows are streamed from the file, and every value is written
+    to whichever page holds its field.
+    """
 
     # Check Excel file
-    if not os.path.exists(EXCEL_FILE):
-        print(f"❌ Excel file not found: {EXCEL_FILE}")
+    if not os.path.exists(rows_file):
+        print(f"❌ Excel file not found: {rows_file}")
         return
 
-    # Read Excel
-    print(f"\n📊 Reading {EXCEL_FILE}...")
-    df = pd.read_excel(EXCEL_FILE)
-    print(f"✅ Found {len(df)} rows")
-    print(f"Columns: {list(df.columns)}")
-
-    # Create output directory
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-    # Field mapping - Using the FULL field paths from the IRS PDF
-    # Based on the output above, the text fields start with topmostSubform[0].Page1[0]...
-    field_mapping = {
-        "CompanyName": "topmostSubform[0].Page1[0].TypeOrPrintBox[0].f1_4[0]",  # Name field
-        "EIN": "topmostSubform[0].Page1[0].PgHeader[0].f1_2[0]",  # EIN at top
-        "TaxYear": "topmostSubform[0].Page1[0].PgHeader[0].f1_1[0]",  # Tax year
-        "AddressLine1": "topmostSubform[0].Page1[0].TypeOrPrintBox[0].f1_5[0]",  # Address
-        "City": "topmostSubform[0].Page1[0].TypeOrPrintBox[0].f1_6[0]",  # City/State/ZIP line
-        "State": "topmostSubform[0].Page1[0].f1_7[0]",
-        "Zip": "topmostSubform[0].Page1[0].f1_8[0]",
-        "TotalIncome": "topmostSubform[0].Page1[0].f1_10[0]",
-        "TotalDeductions": "topmostSubform[0].Page1[0].f1_29[0]",
-        "TaxableIncome": "topmostSubform[0].Page1[0].f1_30[0]",
-        "Tax": "topmostSubform[0].Page1[0].f1_31[0]",
-    }
+    print(f"\n📊 Streaming rows from {rows_file}...")
 
     print("\nField Mapping:")
-    for excel_col, pdf_field in field_mapping.items():
+    for excel_col, pdf_field in FIELD_MAPPING.items():
         print(f"  {excel_col} -> {pdf_field}")
 
-    # Process each row
     print("\n" + "=" * 80)
-    for idx, row in df.iterrows():
-        print(f"\n📄 Processing row {idx + 1}...")
-
-        # Create writer by cloning the reader
-        reader = PdfReader(TEMPLATE_PDF)
-        writer = PdfWriter()
-        writer.clone_document_from_reader(reader)
-
-        # Prepare field data
-        field_data = {}
-        for excel_col, pdf_field in field_mapping.items():
-            if excel_col in row and pd.notna(row[excel_col]):
-                field_data[pdf_field] = str(row[excel_col])
-                print(f"  {excel_col}: {row[excel_col]}")
-
-        # Update form fields
-        if field_data:
-            writer.update_page_form_field_values(writer.pages[0], field_data)
-
-        # Save
-        output_file = os.path.join(OUTPUT_DIR, f"f1120_filled_{idx+1}.pdf")
-        with open(output_file, "wb") as f:
-            writer.write(f)
-
-        print(f"  ✅ Saved: {output_file}")
+    stats = fill_rows(
+        TEMPLATE_PDF,
+        iter_rows(rows_file),
+        FIELD_MAPPING,
+        OUTPUT_DIR,
+        workers=workers,
+        filename_pattern="f1120_filled_{row}.pdf"
+    )
 
     print("\n" + "=" * 80)
-    print(f"🎉 Done! Check {OUTPUT_DIR}/ folder")
+    print(f"🎉 Done! {stats['forms']} forms at {stats['forms_per_second']:.1f} forms/sec. "
+          f"Check {OUTPUT_DIR}/ folder")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill IRS Form 1120 PDFs from a spreadsheet")
+    parser.add_argument('--rows', default=EXCEL_FILE,
+                        help="Excel (.xlsx) or CSV file with one form per row")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes for filling (1 = fill in this process)")
+    args = parser.parse_args()
+
     # Step 1: Inspect fields
     inspect_pdf_fields()
 
@@ -160,7 +153,7 @@ if __name__ == "__main__":
     fill_pdf_simple_test()
 
     # Step 3: Fill from Excel (uncomment when ready)
-    fill_from_excel()
+    fill_from_excel(args.rows, workers=args.workers)
 
     print("\n💡 Next steps:")
     print("1. Open test_pypdf_simple.pdf and see if it has any text")
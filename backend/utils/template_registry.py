@@ -0,0 +1,97 @@
+"""
+In-memory registry of parsed fillable PDF templates
+Location: backend/utils/template_registry.py
+"""
+
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+from models.query_cache import LRUCache
+from utils.pdf_fill_engine import FormTemplate
+
+
+# Form numbers as they appear in file names: "1120", "1040-ES", "W-2", "941.x"
+_FORM_NUMBER = re.compile(r'[A-Za-z0-9][A-Za-z0-9_.-]*')
+
+
+def canonical_form_number(name: str) -> str:
+    """
+    Key a form number or template file name is looked up by
+
+    Case-insensitive, and the "f" prefix of IRS file names is dropped, so
+    "1120", "F1120" and "f1120" (from f1120.pdf) are the same form.
+    """
+    name = name.lower()
+    return name[1:] if name.startswith('f') and len(name) > 1 else name
+
+
+class TemplateRegistry:
+    """
+    Parsed templates by form number, least recently used evicted first
+
+    A form's PDF is read and parsed, and its field catalog built, the first
+    time it is requested; later requests for the same form are served from
+    memory until it is evicted. Templates are the .pdf files in
+    template_dir, matched through canonical_form_number, so <form>.pdf and
+    the IRS naming f<form>.pdf both work and the names listed by
+    available() are the names accepted by get().
+    """
+
+    def __init__(self, template_dir: str, max_size: int = 32):
+        self.template_dir = template_dir
+        self._cache = LRUCache(max_size)
+        self._load_lock = threading.Lock()
+        self.loads = 0
+
+    def _template_files(self) -> Dict[str, str]:
+        """Canonical form number -> template path, for every PDF in template_dir"""
+        if not os.path.isdir(self.template_dir):
+            return {}
+        files = {}
+        for name in sorted(os.listdir(self.template_dir)):
+            if name.lower().endswith('.pdf'):
+                files.setdefault(canonical_form_number(name[:-len('.pdf')]), os.path.join(self.template_dir, name))
+        return files
+
+    def path_for(self, form_number: str) -> Optional[str]:
+        """Template file for a form number, or None if there is none"""
+        if not _FORM_NUMBER.fullmatch(form_number) or '..' in form_number:
+            return None
+        return self._template_files().get(canonical_form_number(form_number))
+
+    def get(self, form_number: str) -> FormTemplate:
+        """
+        Parsed template for a form number
+
+        Raises:
+            KeyError: No template file exists for the form
+        """
+        key = canonical_form_number(form_number)
+        template = self._cache.get(key)
+        if template is not None:
+            return template
+
+        # One load at a time, so concurrent first requests parse a form once;
+        # peek keeps the re-check from counting as a second miss
+        with self._load_lock:
+            template = self._cache.peek(key)
+            if template is None:
+                path = self.path_for(form_number)
+                if path is None:
+                    raise KeyError(form_number)
+                template = FormTemplate(path, name=form_number)
+                self._cache.put(key, template)
+                self.loads += 1
+        return template
+
+    def available(self) -> List[str]:
+        """Form numbers with a template file in template_dir, as get() accepts them"""
+        return sorted(self._template_files())
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._cache.stats(), 'loads': self.loads}
@@ -34,8 +34,11 @@ const AIBot = () => {
     if (!query.trim()) return
 
     setLoading(true)
+    setResponse(null)
     try {
-      const res = await fetch(`${API_BASE}/api/query`, {
+      // Streamed variant of /api/query: matching forms arrive as soon as
+      // retrieval is done, the answer follows in a second event
+      const res = await fetch(`${API_BASE}/api/query/stream?format=ndjson`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -51,8 +54,31 @@ const AIBot = () => {
         throw new Error(`HTTP error! status: ${res.status}`)
       }
 
-      const data = await res.json()
-      setResponse(data)
+      const reader = res.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ''
+
+      while (true) {
+        const { value, done } = await reader.read()
+        if (done) break
+        buffer += decoder.decode(value, { stream: true })
+
+        const lines = buffer.split('\n')
+        buffer = lines.pop()
+        for (const line of lines) {
+          if (!line.trim()) continue
+          const { event, data } = JSON.parse(line)
+
+          if (event === 'retrieval') {
+            setResponse({ ...data, answer: null })
+            setLoading(false)
+          } else if (event === 'answer') {
+            setResponse((prev) => ({ ...prev, answer: data.answer }))
+          } else if (event === 'error') {
+            throw new Error(data.detail)
+          }
+        }
+      }
     } catch (error) {
       console.error('Query failed:', error)
       setResponse({
@@ -194,7 +220,11 @@ const AIBot = () => {
                   AI Answer
                 </h3>
                 <div className="bg-blue-50 border-l-4 border-blue-400 p-3 sm:p-4 rounded-r-lg">
-                  <p className="text-gray-800 leading-relaxed text-sm sm:text-base">{response.answer}</p>
+                  {response.answer === null ? (
+                    <p className="text-gray-500 italic text-sm sm:text-base">Writing answer...</p>
+                  ) : (
+                    <p className="text-gray-800 leading-relaxed text-sm sm:text-base">{response.answer}</p>
+                  )}
                 </div>
               </div>
 